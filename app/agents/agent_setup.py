@@ -1,12 +1,18 @@
 import autogen
 import os
+from dataclasses import dataclass
+
+from app.agents.compaction import ContextCompactor
+from app.core.config import LLM_BASE_URL, CONTEXT_COMPACTION_ENABLED, LLM_API_KEYS, LLM_KEY_POOL_ENABLED, KERNEL_ENABLED
+from app.core.kernel import KernelCodeExecutor
+from app.core.llm_scheduler import get_http_client
 
 # Configuration for the LLM using Groq API - separate configs for each agent to avoid rate limits
 config_list_coordinator = [
     {
         "model": "meta-llama/llama-4-scout-17b-16e-instruct",
         "api_key": os.getenv("GROQ_API_KEY1"),
-        "base_url": "https://api.groq.com/openai/v1",
+        "base_url": LLM_BASE_URL,
         "price": [0.00011, 0.00034]
     }
 ]
@@ -15,7 +21,7 @@ config_list_inspector = [
     {
         "model": "meta-llama/llama-4-scout-17b-16e-instruct",
         "api_key": os.getenv("GROQ_API_KEY2"),
-        "base_url": "https://api.groq.com/openai/v1",
+        "base_url": LLM_BASE_URL,
         "price": [0.00011, 0.00034]
     }
 ]
@@ -24,7 +30,7 @@ config_list_visualizer = [
     {
         "model": "meta-llama/llama-4-scout-17b-16e-instruct",
         "api_key": os.getenv("GROQ_API_KEY3"),
-        "base_url": "https://api.groq.com/openai/v1",
+        "base_url": LLM_BASE_URL,
         "price": [0.00011, 0.00034]
     }
 ]
@@ -33,11 +39,18 @@ config_list_reporter = [
     {
         "model": "meta-llama/llama-4-scout-17b-16e-instruct",
         "api_key": os.getenv("GROQ_API_KEY4"),
-        "base_url": "https://api.groq.com/openai/v1",
+        "base_url": LLM_BASE_URL,
         "price": [0.00011, 0.00034]
     }
 ]
 
+# All keys serve all agents: the shared client picks the key with budget left for each call
+_pooled_client = get_http_client() if LLM_KEY_POOL_ENABLED else None
+if _pooled_client is not None:
+    for config_list in (config_list_coordinator, config_list_inspector, config_list_visualizer, config_list_reporter):
+        config_list[0]["api_key"] = config_list[0]["api_key"] or LLM_API_KEYS[0]  # Replaced per request
+        config_list[0]["http_client"] = _pooled_client
+
 # Separate llm_configs for each agent - optimized for token efficiency
 llm_config_coordinator = {
     "config_list": config_list_coordinator,
@@ -67,12 +80,6 @@ llm_config_reporter = {
     "max_tokens": 800,  # Lower for summary reports
 }
 
-# Common code execution config for agents
-code_execution_config = {
-    "work_dir": "coding",
-    "use_docker": False
-}
-
 # Termination function to detect when workflow is complete
 def is_termination_msg(msg):
     """
@@ -109,23 +116,14 @@ def is_termination_msg(msg):
     
     return False
 
-# 1. Coordinator Agent
-coordinator = autogen.UserProxyAgent(
-    name="CoordinatorAgent",
-    system_message="""You are the coordinator managing the workflow.
+# System prompts are built once at import and shared by every team
+COORDINATOR_SYSTEM_MESSAGE = """You are the coordinator managing the workflow.
 
 Manage DataInspectorAgent, VisualizationAgent, ReportAgent, and CodeExecutor.
 Ensure all requested tasks are completed properly.
-Let agents finish their work before moving to next task.""",
-    code_execution_config=False,
-    human_input_mode="NEVER",
-)
+Let agents finish their work before moving to next task."""
 
-# 2. Data Inspector Agent
-inspector = autogen.AssistantAgent(
-    name="DataInspectorAgent",
-    llm_config=llm_config_inspector,
-    system_message="""You are a data inspector and data cleaner. Only generate code, do not write comments.
+INSPECTOR_SYSTEM_MESSAGE = """You are a data inspector and data cleaner. Only generate code, do not write comments.
 
 Your tasks:
 1. Use the provided data preview to list column names and data types.
@@ -135,18 +133,13 @@ Your tasks:
    - If input is Excel, save cleaned data as cleaned_data.xlsx
    - If input is JSON, save cleaned data as cleaned_data.json
 4. Use pandas to read and save files. Always save cleaned files with clear names.
+5. If a columnar copy of the dataset is given, read it with pd.read_parquet instead of the original file.
 
 When done: Simply respond Data cleaning complete and let the coordinator handle next steps.
 
-Do NOT send empty messages or repeat yourself.""",
-    code_execution_config=code_execution_config,
-)
+Do NOT send empty messages or repeat yourself."""
 
-# 3. Visualization Agent
-visualizer = autogen.AssistantAgent(
-    name="VisualizationAgent",
-    llm_config=llm_config_visualizer,
-    system_message="""You are a data visualization specialist. Only generate code for plots and graphs, do not write comments.
+VISUALIZER_SYSTEM_MESSAGE = """You are a data visualization specialist. Only generate code for plots and graphs, do not write comments.
 
 Your tasks:
 1. CRITICALLY IMPORTANT: Only create visualizations that are EXPLICITLY mentioned in the user's prompt.
@@ -170,15 +163,9 @@ Your tasks:
 
 When done: Simply respond Visualizations complete and let the coordinator handle next steps.
 
-Do NOT send empty messages or repeat yourself.""",
-    code_execution_config=code_execution_config,
-)
+Do NOT send empty messages or repeat yourself."""
 
-# 4. Report Agent
-reporter = autogen.AssistantAgent(
-    name="ReportAgent",
-    llm_config=llm_config_reporter,
-    system_message="""You are a reporting agent. Only generate code and a short report, do not write comments.
+REPORTER_SYSTEM_MESSAGE = """You are a reporting agent. Only generate code and a short report, do not write comments.
 
 Your tasks:
 1. Create a summary report with essential findings.
@@ -187,6 +174,79 @@ Your tasks:
 
 When done: Simply respond Report complete and let the coordinator handle next steps.
 
-Do NOT send empty messages or repeat yourself.""",
-    code_execution_config=code_execution_config,
-)
+Do NOT send empty messages or repeat yourself."""
+
+CODE_EXECUTOR_SYSTEM_MESSAGE = "You execute code generated by other agents. Run all Python code blocks you receive."
+
+
+@dataclass
+class AgentTeam:
+    coordinator: autogen.UserProxyAgent
+    inspector: autogen.AssistantAgent
+    visualizer: autogen.AssistantAgent
+    reporter: autogen.AssistantAgent
+    code_executor: autogen.UserProxyAgent
+    compactor: ContextCompactor
+    kernel: KernelCodeExecutor = None
+
+    @property
+    def members(self):
+        return [self.coordinator, self.inspector, self.visualizer, self.reporter, self.code_executor]
+
+
+def build_agent_team(work_dir: str, dataset_path: str = None) -> AgentTeam:
+    """
+    Build a fresh agent team for one analysis run.
+    Agents keep their conversation state internally, so teams must never be shared
+    between concurrent runs; only the prompts and llm_configs above are reused.
+    With KERNEL_ENABLED the caller must stop team.kernel when the run ends.
+    """
+    # 1. Coordinator Agent
+    coordinator = autogen.UserProxyAgent(
+        name="CoordinatorAgent",
+        system_message=COORDINATOR_SYSTEM_MESSAGE,
+        code_execution_config=False,
+        human_input_mode="NEVER",
+    )
+
+    # 2. Data Inspector Agent
+    inspector = autogen.AssistantAgent(
+        name="DataInspectorAgent",
+        llm_config=llm_config_inspector,
+        system_message=INSPECTOR_SYSTEM_MESSAGE,
+        code_execution_config=False,  # CodeExecutor runs generated code in the run's workspace
+    )
+
+    # 3. Visualization Agent
+    visualizer = autogen.AssistantAgent(
+        name="VisualizationAgent",
+        llm_config=llm_config_visualizer,
+        system_message=VISUALIZER_SYSTEM_MESSAGE,
+        code_execution_config=False,
+    )
+
+    # 4. Report Agent
+    reporter = autogen.AssistantAgent(
+        name="ReportAgent",
+        llm_config=llm_config_reporter,
+        system_message=REPORTER_SYSTEM_MESSAGE,
+        code_execution_config=False,
+    )
+
+    # 5. Code executor that actually RUNS the code the other agents generate
+    # One warm kernel per run: imports and the dataset load happen once, variables persist between blocks
+    kernel = KernelCodeExecutor(work_dir, dataset_path) if KERNEL_ENABLED else None
+    code_executor = autogen.UserProxyAgent(
+        name="CodeExecutor",
+        system_message=CODE_EXECUTOR_SYSTEM_MESSAGE,
+        human_input_mode="NEVER",
+        code_execution_config={"executor": kernel} if kernel else {"work_dir": work_dir, "use_docker": False},
+    )
+
+    # Compact the transcript each LLM agent sends, for this run only
+    compactor = ContextCompactor()
+    if CONTEXT_COMPACTION_ENABLED:
+        for agent in (inspector, visualizer, reporter):
+            agent.register_hook("process_all_messages_before_reply", compactor)
+
+    return AgentTeam(coordinator, inspector, visualizer, reporter, code_executor, compactor, kernel)
@@ -0,0 +1,69 @@
+from app.core.config import (
+    COMPACTION_KEEP_RECENT,
+    COMPACTION_OLD_MESSAGE_CHARS,
+    COMPACTION_MAX_OUTPUT_CHARS,
+)
+
+# Code execution results start with this, e.g. "exitcode: 0 (execution succeeded)"
+EXECUTION_OUTPUT_PREFIX = "exitcode:"
+
+
+def normalize(content: str) -> str:
+    """Whitespace-only differences shouldn't change the prompt (or its cache key)."""
+    lines = content.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def _head_and_tail(content: str, limit: int) -> str:
+    if len(content) <= limit:
+        return content
+    head = limit * 2 // 3
+    tail = limit - head
+    omitted = len(content) - head - tail
+    return f"{content[:head]}\n[... {omitted} characters omitted ...]\n{content[-tail:]}"
+
+
+class ContextCompactor:
+    """
+    process_all_messages_before_reply hook that shrinks the transcript an agent sends
+    to the LLM. The first message (the task) and the latest COMPACTION_KEEP_RECENT
+    messages are kept, older turns are cut short and long code execution output is
+    reduced to its head and tail. The GroupChat's own history is never modified.
+    """
+
+    def __init__(self, keep_recent: int = COMPACTION_KEEP_RECENT,
+                 old_message_chars: int = COMPACTION_OLD_MESSAGE_CHARS,
+                 max_output_chars: int = COMPACTION_MAX_OUTPUT_CHARS):
+        self.keep_recent = keep_recent
+        self.old_message_chars = old_message_chars
+        self.max_output_chars = max_output_chars
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def __call__(self, messages):
+        compacted = []
+        recent_start = len(messages) - self.keep_recent
+        for index, message in enumerate(messages):
+            content = message.get("content")
+            if not isinstance(content, str):
+                compacted.append(message)
+                continue
+            self.chars_in += len(content)
+
+            new_content = normalize(content)
+            if new_content.startswith(EXECUTION_OUTPUT_PREFIX):
+                new_content = _head_and_tail(new_content, self.max_output_chars)
+            if 0 < index < recent_start:
+                new_content = _head_and_tail(new_content, self.old_message_chars)
+
+            self.chars_out += len(new_content)
+            compacted.append({**message, "content": new_content} if new_content != content else message)
+        return compacted
+
+    def stats(self) -> dict:
+        saved = self.chars_in - self.chars_out
+        return {
+            "chars_before": self.chars_in,
+            "chars_after": self.chars_out,
+            "estimated_tokens_saved": saved // 4,  # ~4 characters per token
+        }
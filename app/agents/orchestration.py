@@ -0,0 +1,86 @@
+import re
+import logging
+
+from app.core.config import ORCHESTRATION_MAX_FIX_ATTEMPTS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_CHART_REQUEST = re.compile(
+    r"\b(chart|charts|plot|plots|graph|graphs|histogram|histograms|visuali[sz]\w*|pie|bar|bars|scatter|"
+    r"heatmap|heat map|boxplot|box plot|distribution|distributions|trend|trends)\b"
+)
+_INSPECTION_REQUEST = re.compile(
+    r"\b(clean\w*|missing|null|nulls|nan|duplicate\w*|types?|dtypes|inspect\w*|describe|summar\w*|"
+    r"statistic\w*|stats|overview|outliers?|quality|remove|drop|fill|impute)\b"
+)
+
+
+def plan_stages(team, prompt: str):
+    """
+    Agents the request needs, in order. The inspector runs unless only charts were
+    asked for, the visualizer only when a chart was asked for, the reporter always.
+    """
+    text = prompt.lower()
+    wants_charts = bool(_CHART_REQUEST.search(text))
+    stages = []
+    if _INSPECTION_REQUEST.search(text) or not wants_charts:
+        stages.append(team.inspector)
+    if wants_charts:
+        stages.append(team.visualizer)
+    stages.append(team.reporter)
+    return stages
+
+
+def max_rounds(stages) -> int:
+    """Upper bound on messages: the task, then per stage the agent and executor, plus fix rounds."""
+    return 1 + len(stages) * 2 * (1 + ORCHESTRATION_MAX_FIX_ATTEMPTS)
+
+
+def _has_code(content: str) -> bool:
+    return "```" in content
+
+
+def _execution_failed(content: str) -> bool:
+    return content.startswith("exitcode:") and not content.startswith("exitcode: 0")
+
+
+class StageSpeakerSelector:
+    """
+    speaker_selection_method for the GroupChat: Coordinator -> stage agent -> CodeExecutor
+    -> next stage agent -> ... -> done, without asking an LLM who speaks next.
+    An agent whose code failed gets the executor's output back to fix it, up to
+    ORCHESTRATION_MAX_FIX_ATTEMPTS times; a reply without code moves straight on.
+    """
+
+    def __init__(self, team, stages):
+        self.team = team
+        self.stages = stages
+        self.index = -1
+        self.fix_attempts = 0
+
+    def _advance(self):
+        self.index += 1
+        self.fix_attempts = 0
+        if self.index >= len(self.stages):
+            return None  # No next speaker ends the chat
+        return self.stages[self.index]
+
+    def __call__(self, last_speaker, groupchat):
+        content = groupchat.messages[-1].get("content") if groupchat.messages else ""
+        content = content if isinstance(content, str) else str(content or "")
+
+        if self.index < 0:
+            return self._advance()
+
+        if last_speaker is self.team.code_executor:
+            if _execution_failed(content) and self.fix_attempts < ORCHESTRATION_MAX_FIX_ATTEMPTS:
+                self.fix_attempts += 1
+                logger.info(f"{self.stages[self.index].name} code failed, asking for a fix ({self.fix_attempts})")
+                return self.stages[self.index]
+            return self._advance()
+
+        if last_speaker is self.stages[self.index] and _has_code(content):
+            return self.team.code_executor
+        return self._advance()
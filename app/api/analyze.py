@@ -1,12 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-import pandas as pd
 import os
 import logging
 import traceback
 
-from app.core.agent_service import run_eda_workflow
+from app.core import events
+from app.core import job_queue
+from app.core import profiler
+from app.core.preview import build_preview
 from app.database import database, models
 
 # Set up logging
@@ -18,87 +21,10 @@ router = APIRouter()
 class AnalysisRequest(BaseModel):
     session_id: str
     text: str
-
-def process_analysis(session_id: str, text: str, dataset_path: str, data_preview: str):
-    """
-    Background task to run the EDA workflow and update the database.
-    """
-    # Create a new database session for the background task
-    bg_db = database.SessionLocal()
-    try:
-        logger.info(f"Starting background analysis for session {session_id}")
-        # Run the EDA workflow
-        result = run_eda_workflow(session_id, text, dataset_path, data_preview)
-
-        try:
-            # Save the chat history to the database
-            chat_history = result.get("chat_history", [])
-            for message in chat_history:
-                # Ensure content is a string before logging
-                content = message.get("content", "")
-                if not isinstance(content, str):
-                    content = str(content)
-                
-                # Handle NaN/Infinity values in content
-                import math
-                if isinstance(content, str):
-                    # Check if content contains numeric values that might be NaN
-                    try:
-                        # If content looks like JSON, parse and sanitize it
-                        if content.strip().startswith('{') or content.strip().startswith('['):
-                            import json
-                            parsed_content = json.loads(content)
-                            def sanitize_content(obj):
-                                if isinstance(obj, float):
-                                    if math.isnan(obj) or math.isinf(obj):
-                                        return None
-                                elif isinstance(obj, dict):
-                                    return {k: sanitize_content(v) for k, v in obj.items()}
-                                elif isinstance(obj, list):
-                                    return [sanitize_content(item) for item in obj]
-                                return obj
-                            content = json.dumps(sanitize_content(parsed_content))
-                    except:
-                        pass  # If parsing fails, keep original content
-
-                new_log = models.Log(
-                    session_id=session_id,
-                    command=message.get("name", message.get("role", "unknown_agent")),
-                    output_summary=content
-                )
-                bg_db.add(new_log)
-
-            # Update session status
-            session = bg_db.query(models.Session).filter(models.Session.session_id == session_id).first()
-            if session:
-                session.status = "completed"
-                bg_db.commit()
-            
-            logger.info(f"Background analysis for session {session_id} completed successfully.")
-            
-        except Exception as e:
-            logger.error(f"Error saving results to DB for session {session_id}: {e}")
-            logger.error(traceback.format_exc())
-            if session:
-                session.status = "failed"
-                bg_db.commit()
-
-    except Exception as e:
-        logger.error(f"Background analysis failed for session {session_id}: {e}")
-        logger.error(traceback.format_exc())
-        # Try to update status to failed
-        try:
-            session = bg_db.query(models.Session).filter(models.Session.session_id == session_id).first()
-            if session:
-                session.status = "failed"
-                bg_db.commit()
-        except:
-            pass
-    finally:
-        bg_db.close()
+    priority: int = 0  # Higher runs first when analyses are queued
 
 @router.post("/analyze")
-async def analyze_data(request: AnalysisRequest, background_tasks: BackgroundTasks, db: Session = Depends(database.get_db)):
+async def analyze_data(request: AnalysisRequest, db: Session = Depends(database.get_db)):
     try:
         logger.info(f"Received analyze request for session: {request.session_id}")
         
@@ -118,57 +44,38 @@ async def analyze_data(request: AnalysisRequest, background_tasks: BackgroundTas
         
         logger.info(f"Processing file: {dataset_path} ({file_type})")
 
-        # Read the file content to pass to the agent
+        if file_type not in ('.csv', '.xlsx', '.json'):
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_type}")
+
+        # Stream only the first rows of the file for the agent preview and the UI table
         try:
-            if file_type == '.csv':
-                df = pd.read_csv(dataset_path)
-            elif file_type == '.xlsx':
-                df = pd.read_excel(dataset_path)
-            elif file_type == '.json':
-                df = pd.read_json(dataset_path)
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_type}")
-            
-            # Get a minimal preview of the data (first 1 row only) to save tokens
-            data_preview = df.head(1).to_string()
+            preview = await run_in_threadpool(build_preview, request.session_id, dataset_path, file_type)
         except Exception as e:
             logger.error(f"Failed to read file: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to read or process the data file: {str(e)}")
 
-        # Update status to running
-        session.status = "running"
-        db.commit()
+        # The agents get the column profile when the upload has one, otherwise the raw first row
+        profile = profiler.load_profile(dataset_path)
+        if profile is not None:
+            data_preview = profiler.summarize_profile(profile)
+        else:
+            rows = f"~{preview['row_count']} (estimated)" if preview["row_count_estimated"] else preview["row_count"]
+            data_preview = f"{preview['data_preview']}\nRows: {rows}, Columns: {preview['column_count']}"
 
-        # Add background task
-        background_tasks.add_task(process_analysis, request.session_id, request.text, dataset_path, data_preview)
-
-        # Prepare table_data (first 10 rows as records for UI table) - Immediate response
-        table_data = []
-        try:
-            table_data = df.head(10).to_dict(orient="records")
-            # Handle NaN/Infinity values that can't be JSON serialized
-            import math
-            import numpy as np
-            
-            def make_json_serializable(obj):
-                if isinstance(obj, float):
-                    if math.isnan(obj) or math.isinf(obj):
-                        return None  # Convert NaN/Infinity to None
-                elif isinstance(obj, dict):
-                    return {k: make_json_serializable(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [make_json_serializable(item) for item in obj]
-                return obj
-            
-            table_data = make_json_serializable(table_data)
-        except Exception:
-            table_data = []
+        # Queue the analysis; a worker process picks it up and marks the session "running"
+        session.status = "queued"  # Committed together with the job
+        job = job_queue.enqueue(db, request.session_id, request.text, dataset_path, data_preview, request.priority)
+        events.publish(request.session_id, "status", status="queued")
 
         return {
-            "message": "Analysis started in background.",
+            "message": "Analysis queued.",
             "session_id": request.session_id,
-            "status": "running",
-            "table_data": table_data
+            "job_id": job.id,
+            "status": "queued",
+            "table_data": preview["table_data"],
+            "row_count": preview["row_count"],
+            "row_count_estimated": preview["row_count_estimated"],  # CSV line count, before the dataset is parsed
+            "column_count": preview["column_count"]
         }
     except HTTPException as he:
         raise he
@@ -176,3 +83,31 @@ async def analyze_data(request: AnalysisRequest, background_tasks: BackgroundTas
         logger.error(f"Unexpected error in analyze_data: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.post("/analyze/{session_id}/cancel")
+async def cancel_analysis(session_id: str, db: Session = Depends(database.get_db)):
+    """
+    Cancel a session's queued or running analysis. Queued jobs are dropped at once;
+    a running one stops at its next agent round and its code execution is killed.
+    """
+    session = db.query(models.Session).filter(models.Session.session_id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    if not job_queue.cancel_session_jobs(db, session_id):
+        raise HTTPException(status_code=409, detail=f"No queued or running analysis to cancel (status: {session.status}).")
+
+    running = (
+        db.query(models.Job.id)
+        .filter(models.Job.session_id == session_id, models.Job.status == "running")
+        .first()
+    )
+    if running is None:
+        # Nothing had started yet, so nothing else will update the session
+        session.status = "cancelled"
+        db.commit()
+        events.publish(session_id, "status", status="cancelled", reason="Cancelled by user")
+        return {"message": "Analysis cancelled.", "session_id": session_id, "status": "cancelled"}
+
+    logger.info(f"Cancellation requested for running analysis of session {session_id}")
+    return {"message": "Cancellation requested.", "session_id": session_id, "status": "cancelling"}
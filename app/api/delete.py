@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import shutil
 import os
 
+from app.core import archive, dataset_cache, job_queue
+from app.core.config import CANCEL_WAIT_SECONDS
 from app.database import database, models
 
 router = APIRouter()
@@ -21,6 +24,15 @@ async def delete_session_data(session_id: str, db: Session = Depends(database.ge
     if not session_to_delete:
         raise HTTPException(status_code=404, detail="No data found for the given session ID.")
 
+    # Stop the session's analyses and wait for running ones to exit before their files go away
+    job_queue.cancel_session_jobs(db, session_id)
+    if not await run_in_threadpool(job_queue.wait_for_session_jobs, session_id, CANCEL_WAIT_SECONDS):
+        raise HTTPException(status_code=409, detail="The session's analysis is still stopping, try again shortly.")
+
+    # Drop the parsed dataset from memory before its files go away
+    dataset_cache.invalidate(session_id)
+    archive.invalidate(session_id)
+
     # Delete associated files and directories
     session_upload_path = os.path.join(UPLOADS_DIR, session_id)
     session_results_path = os.path.join(RESULTS_DIR, session_id)
@@ -49,6 +61,7 @@ async def delete_session_data(session_id: str, db: Session = Depends(database.ge
     # Delete database records
     db.query(models.File).filter(models.File.session_id == session_id).delete()
     db.query(models.Log).filter(models.Log.session_id == session_id).delete()
+    db.query(models.Job).filter(models.Job.session_id == session_id).delete()
     db.query(models.Session).filter(models.Session.session_id == session_id).delete()
     db.commit()
 
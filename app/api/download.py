@@ -1,37 +1,53 @@
-from fastapi import APIRouter, HTTPException, Depends, Response
+from email.utils import formatdate
+
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import database, models
 import os
-import shutil
-import tempfile
-from fastapi.responses import FileResponse
 
-router = APIRouter()
+from app.core import archive
+from app.core.file_delivery import not_modified
+from app.database import database, models
 
-# Use dynamic paths like results.py
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-RESULTS_DIRECTORY = os.path.join(BASE_DIR, "data", "results")
-UPLOADS_DIRECTORY = os.path.join(BASE_DIR, "data", "uploads")
+router = APIRouter()
 
 @router.get("/download/{session_id}")
-def download_session_files(session_id: str, db: Session = Depends(database.get_db)):
+def download_session_files(session_id: str, request: Request, db: Session = Depends(database.get_db)):
     # Get all files from results and uploads for this session
-    files = []
-    session_results_dir = os.path.join(RESULTS_DIRECTORY, session_id)
-    session_uploads_dir = os.path.join(UPLOADS_DIRECTORY, session_id)
-    for d in [session_results_dir, session_uploads_dir]:
-        if os.path.isdir(d):
-            for f in os.listdir(d):
-                fpath = os.path.join(d, f)
-                if os.path.isfile(fpath):
-                    files.append((f, fpath))
+    files = archive.session_files(session_id)
     if not files:
         raise HTTPException(status_code=404, detail="No files found for this session.")
-    # Create a zip file in a temp location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp:
-        from zipfile import ZipFile
-        with ZipFile(tmp, 'w') as zipf:
-            for fname, fpath in files:
-                zipf.write(fpath, arcname=fname)
-        tmp_path = tmp.name
-    return FileResponse(tmp_path, filename=f"session_{session_id}_files.zip", media_type="application/zip")
+    filename = f"session_{session_id}_files.zip"
+
+    session = db.query(models.Session.status).filter(models.Session.session_id == session_id).first()
+    if not session or session.status != "completed":
+        # Results may still change: build the archive while the client reads it, without caching.
+        # Its length isn't known up front, so byte ranges aren't offered on this stream
+        return StreamingResponse(
+            archive.stream_zip(files),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"', "Accept-Ranges": "none"},
+        )
+
+    # Completed sessions: one archive per manifest, built on the first download
+    digest = archive.manifest_hash(files)
+    etag = f'"{digest}"'
+    last_modified = max(os.stat(path).st_mtime for _, path in files)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",  # Revalidate; the ETag makes that a 304
+    }
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    cached_path = archive.cached_archive_path(session_id, digest)
+    if os.path.exists(cached_path):
+        # Served with sendfile, and supports Range for resumed downloads
+        return FileResponse(cached_path, filename=filename, media_type="application/zip", headers=headers)
+
+    return StreamingResponse(
+        archive.stream_and_cache_zip(files, cached_path),
+        media_type="application/zip",
+        headers={**headers, "Content-Disposition": f'attachment; filename="{filename}"', "Accept-Ranges": "none"},
+    )
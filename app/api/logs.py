@@ -0,0 +1,76 @@
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import database, models
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500  # Rows fetched from the server-side cursor at a time
+
+
+def _log_query(db: Session, session_id: str, after: int, command: Optional[str], since: Optional[datetime]):
+    """Keyset query: rows with id > after in id order, so each page is an index range scan."""
+    query = db.query(models.Log).filter(models.Log.session_id == session_id, models.Log.id > after)
+    if command:
+        query = query.filter(models.Log.command == command)
+    if since:
+        query = query.filter(models.Log.timestamp >= since)
+    return query.order_by(models.Log.id)
+
+
+def _log_info(log: models.Log) -> dict:
+    return {
+        "id": log.id,
+        "command": log.command,
+        "output_summary": log.output_summary,
+        "timestamp": str(log.timestamp),
+    }
+
+
+def _stream_logs(session_id: str, after: int, command: Optional[str], since: Optional[datetime]):
+    # Own session: the response body is produced after the request's dependencies are closed
+    db = database.SessionLocal()
+    try:
+        for log in _log_query(db, session_id, after, command, since).yield_per(STREAM_BATCH_SIZE):
+            yield json.dumps(_log_info(log)) + "\n"
+    finally:
+        db.close()
+
+
+@router.get("/logs/{session_id}")
+def get_logs(
+    session_id: str,
+    after: int = Query(0, ge=0, description="Return logs with an id greater than this cursor"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    command: Optional[str] = Query(None, description="Only logs from this agent/command"),
+    since: Optional[datetime] = Query(None, description="Only logs written at or after this time"),
+    stream: bool = Query(False, description="Stream every matching log as NDJSON instead of one page"),
+    db: Session = Depends(database.get_db),
+):
+    """Read a session's chat transcript, one page at a time or as a stream."""
+    session = db.query(models.Session.id).filter(models.Session.session_id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if since and since.tzinfo:
+        # Timestamps are written in UTC by the database
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if stream:
+        return StreamingResponse(
+            _stream_logs(session_id, after, command, since), media_type="application/x-ndjson"
+        )
+
+    logs = _log_query(db, session_id, after, command, since).limit(limit).all()
+    return {
+        "session_id": session_id,
+        "logs": [_log_info(log) for log in logs],
+        # Pass back as `after` for the next page; None once everything has been read
+        "next_cursor": logs[-1].id if len(logs) == limit else None,
+    }
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core import profiler
+from app.database import database, models
+
+router = APIRouter()
+
+@router.get("/profile/{session_id}")
+async def get_profile(session_id: str, db: Session = Depends(database.get_db)):
+    """Column profile of the session's dataset, built on first request if the upload hasn't produced it yet."""
+    file_record = db.query(models.File).filter(models.File.session_id == session_id).first()
+    if not file_record:
+        raise HTTPException(status_code=404, detail="Dataset not found for this session.")
+
+    profile = profiler.load_profile(file_record.file_path)
+    if profile is None:
+        profile = await run_in_threadpool(profiler.write_profile, file_record.file_path, file_record.file_type)
+    if profile is None:
+        raise HTTPException(status_code=500, detail="Failed to profile the dataset.")
+
+    return {"session_id": session_id, "profile": profile}
@@ -0,0 +1,91 @@
+import json
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core import events
+from app.core.config import EVENTS_KEEPALIVE_SECONDS
+from app.database import database, models
+
+router = APIRouter()
+
+
+def _session_status(session_id: str):
+    db = database.SessionLocal()
+    try:
+        session = db.query(models.Session.status).filter(models.Session.session_id == session_id).first()
+        return session.status if session else None
+    finally:
+        db.close()
+
+
+async def session_events(session_id: str, status: str):
+    """
+    Progress events for a session, starting with its current status and ending after a
+    terminal one. Yields None when nothing happened for EVENTS_KEEPALIVE_SECONDS.
+    """
+    listener = events.bus.subscribe(session_id)
+    try:
+        yield {"type": "status", "session_id": session_id, "status": status}
+        while status not in events.TERMINAL_STATUSES:
+            try:
+                event = await asyncio.wait_for(listener.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Quiet period: fall back to the database in case events aren't reaching this process
+                current = await run_in_threadpool(_session_status, session_id)
+                if current and current != status:
+                    status = current
+                    yield {"type": "status", "session_id": session_id, "status": status}
+                else:
+                    yield None
+                continue
+            if event["type"] == "status":
+                status = event["status"]
+            yield event
+    finally:
+        events.bus.unsubscribe(session_id, listener)
+
+
+@router.get("/events/{session_id}")
+async def stream_events(session_id: str, request: Request):
+    """Server-Sent Events stream of status changes, agent messages and result files."""
+    status = await run_in_threadpool(_session_status, session_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    async def event_stream():
+        async for event in session_events(session_id, status):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws/{session_id}")
+async def websocket_events(websocket: WebSocket, session_id: str):
+    """The same events as /events, as JSON messages over a WebSocket."""
+    status = await run_in_threadpool(_session_status, session_id)
+    if status is None:
+        await websocket.close(code=4404, reason="Session not found")
+        return
+
+    await websocket.accept()
+    try:
+        async for event in session_events(session_id, status):
+            if event is None:
+                await websocket.send_json({"type": "keepalive", "session_id": session_id})
+            else:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
+from typing import Optional
 import os
 
+from app.core.file_delivery import content_version, file_response
 from app.database import database, models
 
 router = APIRouter()
@@ -10,6 +12,18 @@ router = APIRouter()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RESULTS_DIRECTORY = os.path.join(BASE_DIR, "data", "results")
 
+# Chart preview file types and the key they are exposed under on their chart
+PREVIEW_URL_KEYS = {
+    "visualization_thumbnail": "thumbnail_url",
+    "visualization_web": "web_url",
+}
+
+def _file_url(session_id: str, file_path: str) -> str:
+    """Result URL versioned by the file's size and mtime, so it changes whenever a run rewrites the file."""
+    url = f"/data/results/{session_id}/{os.path.basename(file_path)}"
+    version = content_version(file_path)
+    return f"{url}?v={version}" if version else url
+
 @router.get("/results/{session_id}")
 async def get_results(session_id: str, db: Session = Depends(database.get_db)):
     """Get all result files for a session, grouped by type."""
@@ -30,10 +44,26 @@ async def get_results(session_id: str, db: Session = Depends(database.get_db)):
         "other": []
     }
     
+    # The uploaded dataset is registered too but isn't served from the results directory
+    results_root = os.path.realpath(session_results_dir)
+    files = [
+        f for f in files
+        if os.path.commonpath([os.path.realpath(f.file_path), results_root]) == results_root
+    ]
+
+    # Preview variants are attached to the chart they were made from, keyed by its file stem
+    previews = {}
+    for file_record in files:
+        if file_record.file_type in PREVIEW_URL_KEYS:
+            stem = os.path.basename(file_record.file_path).rsplit(".", 2)[0]
+            previews.setdefault(stem, {})[PREVIEW_URL_KEYS[file_record.file_type]] = _file_url(session_id, file_record.file_path)
+
     for file_record in files:
+        if file_record.file_type in PREVIEW_URL_KEYS:
+            continue
         file_info = {
             "filename": os.path.basename(file_record.file_path),
-            "url": f"/data/results/{session_id}/{os.path.basename(file_record.file_path)}",
+            "url": _file_url(session_id, file_record.file_path),
             "type": file_record.file_type,
             "created_at": str(file_record.created_at)
         }
@@ -42,6 +72,8 @@ async def get_results(session_id: str, db: Session = Depends(database.get_db)):
         if file_record.file_type in ["cleaned_csv", "cleaned_excel", "cleaned_json"]:
             results["cleaned_data"].append(file_info)
         elif file_record.file_type == "visualization":
+            # thumbnail_url / web_url when previews were rendered for this chart
+            file_info.update(previews.get(os.path.splitext(file_info["filename"])[0], {}))
             results["visualizations"].append(file_info)
         elif file_record.file_type == "chart_code":
             results["chart_code"].append(file_info)
@@ -55,3 +87,24 @@ async def get_results(session_id: str, db: Session = Depends(database.get_db)):
         "results": results,
         "total_files": len(files)
     }
+
+@router.get("/data/results/{session_id}/{filename}")
+def get_result_file(session_id: str, filename: str, request: Request, v: Optional[str] = None, db: Session = Depends(database.get_db)):
+    """Serve a registered result file. Only files recorded in the File table can be fetched."""
+    query = db.query(models.File).filter(models.File.session_id == session_id)
+    # Latest registration wins when a file was produced by more than one run
+    file_record = next(
+        (f for f in query.order_by(models.File.id.desc()) if os.path.basename(f.file_path) == filename),
+        None,
+    )
+    if file_record is None:
+        raise HTTPException(status_code=404, detail="File not found.")
+
+    # The stored path must still point inside this session's results directory
+    session_results_dir = os.path.realpath(os.path.join(RESULTS_DIRECTORY, session_id))
+    file_path = os.path.realpath(file_record.file_path)
+    if os.path.commonpath([file_path, session_results_dir]) != session_results_dir or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="File not found.")
+
+    # Only a URL carrying the current version refers to these exact bytes, so only that one may be kept for good
+    return file_response(request, file_path, immutable=v is not None and v == content_version(file_path))
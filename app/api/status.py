@@ -16,7 +16,7 @@ async def get_session_status(session_id: str, db: Session = Depends(database.get
     
     return {
         "session_id": session_id,
-        "status": session.status,  # "created", "running", "completed", "failed"
+        "status": session.status,  # "created", "queued", "running", "completed", "failed", "cancelled"
         "created_at": str(session.created_at),
         "dataset_name": session.dataset_name
     }
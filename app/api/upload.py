@@ -1,9 +1,10 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
 import shutil
 import os
 import uuid
 
+from app.core import dataset_cache, profiler
 from app.database import database, models
 
 router = APIRouter()
@@ -13,7 +14,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 UPLOAD_DIRECTORY = os.path.join(BASE_DIR, "data", "uploads")
 
 @router.post("/upload")
-async def upload_dataset(file: UploadFile = File(...), db: Session = Depends(database.get_db)):
+async def upload_dataset(background_tasks: BackgroundTasks, file: UploadFile = File(...), db: Session = Depends(database.get_db)):
     # Ensure the upload directory exists
     os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
 
@@ -51,4 +52,9 @@ async def upload_dataset(file: UploadFile = File(...), db: Session = Depends(dat
     db.add(new_file)
     db.commit()
 
+    # Convert to a columnar copy once, chunk by chunk so large uploads never sit in memory whole,
+    # then profile it (background tasks run in order, so profiling reads the copy)
+    background_tasks.add_task(dataset_cache.convert_to_columnar, file_path, file_extension)
+    background_tasks.add_task(profiler.write_profile, file_path, file_extension)
+
     return {"session_id": session_id, "filename": file.filename, "path": file_path}
@@ -1,7 +1,19 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import shutil
 import os
-import requests
+import time
+
+from app.core import transcription_cache
+from app.core.audio_probe import clip_size, clip_duration
+from app.core.config import (
+    VOICE_STREAM_UPLOADS,
+    VOICE_MAX_BYTES,
+    VOICE_MAX_SECONDS,
+    TRANSCRIPTION_MODEL,
+    TRANSCRIPTION_CACHE_ENABLED,
+)
+from app.core.transcription import transcribe, TranscriptionError
 
 router = APIRouter()
 
@@ -9,13 +21,68 @@ router = APIRouter()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 AUDIO_DIRECTORY = os.path.join(BASE_DIR, "data", "audio")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
+
+# In-process counters for the voice endpoint
+voice_metrics = {
+    "streamed_requests": 0,
+    "disk_requests": 0,
+    "rejected_clips": 0,
+    "bytes_streamed": 0,
+    "disk_bytes_avoided": 0,  # Each streamed clip skips one disk write and one disk read
+    "stream_prep_seconds": 0.0,
+    "disk_prep_seconds": 0.0,
+}
+
+def _check_clip_limits(audio_file):
+    """Reject oversized clips before any bytes go upstream. Returns the clip size."""
+    size = clip_size(audio_file)
+    if VOICE_MAX_BYTES and size > VOICE_MAX_BYTES:
+        voice_metrics["rejected_clips"] += 1
+        raise HTTPException(status_code=413, detail=f"Audio clip is too large ({size} bytes, limit {VOICE_MAX_BYTES}).")
+
+    if VOICE_MAX_SECONDS:
+        duration = clip_duration(audio_file)
+        if duration is not None and duration > VOICE_MAX_SECONDS:
+            voice_metrics["rejected_clips"] += 1
+            raise HTTPException(status_code=413, detail=f"Audio clip is too long ({duration:.1f}s, limit {VOICE_MAX_SECONDS:.0f}s).")
+    return size
 
 @router.post("/voice")
 async def handle_voice(session_id: str = Form(...), file: UploadFile = File(...)):
     if not session_id:
         raise HTTPException(status_code=400, detail="Session ID is required.")
 
+    # Send to Groq API for transcription
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=500, detail="Groq API key is not configured.")
+
+    started = time.perf_counter()
+    # Seeking through the spool and probing the WAV header are blocking file I/O
+    size = await run_in_threadpool(_check_clip_limits, file.file)
+
+    # Replayed clips are answered from the local cache without a network round trip.
+    # Hashing the clip and the SQLite lookups block, so they run off the event loop.
+    cache_key = None
+    if TRANSCRIPTION_CACHE_ENABLED:
+        cache_key = await run_in_threadpool(transcription_cache.audio_key, file.file, TRANSCRIPTION_MODEL)
+        cached_text = await run_in_threadpool(transcription_cache.get, cache_key)
+        if cached_text is not None:
+            return {"session_id": session_id, "transcribed_text": cached_text}
+
+    if VOICE_STREAM_UPLOADS:
+        # The upload spool (in memory for small clips) is sent as-is, nothing touches data/audio
+        voice_metrics["streamed_requests"] += 1
+        voice_metrics["bytes_streamed"] += size
+        voice_metrics["disk_bytes_avoided"] += 2 * size
+        voice_metrics["stream_prep_seconds"] += time.perf_counter() - started
+        try:
+            transcribed_text = await transcribe(file.file, file.filename, file.content_type, GROQ_API_KEY)
+        except TranscriptionError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to transcribe audio: {e}")
+        if cache_key:
+            await run_in_threadpool(transcription_cache.put, cache_key, transcribed_text)
+        return {"session_id": session_id, "transcribed_text": transcribed_text}
+
     session_audio_dir = os.path.join(AUDIO_DIRECTORY, session_id)
     os.makedirs(session_audio_dir, exist_ok=True)
 
@@ -24,25 +91,34 @@ async def handle_voice(session_id: str = Form(...), file: UploadFile = File(...)
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
 
-    # Send to Groq API for transcription
-    if not GROQ_API_KEY:
-        raise HTTPException(status_code=500, detail="Groq API key is not configured.")
-
     try:
         with open(file_path, "rb") as audio_file:
-            files = {
-                'file': (file.filename, audio_file, file.content_type),
-                'model': (None, 'whisper-large-v3'),
-            }
-            headers = {'Authorization': f'Bearer {GROQ_API_KEY}'}
-            response = requests.post(GROQ_API_URL, files=files, headers=headers)
-            response.raise_for_status() # Raise an exception for bad status codes
-            transcribed_text = response.json().get("text", "")
-    except requests.exceptions.RequestException as e:
+            voice_metrics["disk_requests"] += 1
+            voice_metrics["disk_prep_seconds"] += time.perf_counter() - started
+            transcribed_text = await transcribe(audio_file, file.filename, file.content_type, GROQ_API_KEY)
+    except TranscriptionError as e:
         raise HTTPException(status_code=500, detail=f"Failed to transcribe audio: {e}")
     finally:
         # Clean up the temporary audio file
         if os.path.exists(file_path):
             os.remove(file_path)
 
+    if cache_key:
+        await run_in_threadpool(transcription_cache.put, cache_key, transcribed_text)
     return {"session_id": session_id, "transcribed_text": transcribed_text}
+
+@router.get("/voice/metrics")
+async def get_voice_metrics():
+    """Counters for the voice endpoint, including the disk traffic and latency saved by streaming."""
+    metrics = dict(voice_metrics)
+    stream_avg = metrics["stream_prep_seconds"] / metrics["streamed_requests"] if metrics["streamed_requests"] else None
+    disk_avg = metrics["disk_prep_seconds"] / metrics["disk_requests"] if metrics["disk_requests"] else None
+    metrics["avg_stream_prep_seconds"] = stream_avg
+    metrics["avg_disk_prep_seconds"] = disk_avg
+    # Only meaningful once both paths have served requests
+    if stream_avg is not None and disk_avg is not None:
+        metrics["avg_latency_saved_seconds"] = disk_avg - stream_avg
+    cache_stats = transcription_cache.store.stats()
+    metrics["cache_hits"] = cache_stats["hits"]
+    metrics["cache_misses"] = cache_stats["misses"]
+    return metrics
@@ -0,0 +1,68 @@
+import logging
+import traceback
+
+from app.core import cancellation, events
+from app.core.cancellation import AnalysisCancelled
+from app.core.agent_service import run_eda_workflow
+from app.core.fast_path import run_fast_path
+from app.database import database, models
+from app.database.persistence import RunRecorder
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def process_analysis(session_id: str, text: str, dataset_path: str, data_preview: str, run_id=None):
+    """
+    Run the EDA workflow and update the database.
+    Returns the final session status, "completed", "failed" or "cancelled".
+    `run_id` (the job id) lets the worker cancel this run with cancellation.cancel_run.
+    """
+    # Logs are collected during the run and written in one transaction at the end; result files
+    # are written when they are registered, just before their events go out
+    recorder = RunRecorder(session_id)
+    # Lets the worker cancel the run and stops it once it is over its time or token budget
+    budget = cancellation.start_run(session_id, run_id)
+    try:
+        logger.info(f"Starting background analysis for session {session_id}")
+        with database.session_scope() as db:
+            db.query(models.Session).filter(models.Session.session_id == session_id).update(
+                {models.Session.status: "running"}, synchronize_session=False
+            )
+        events.publish(session_id, "status", status="running")
+
+        # Common requests are answered directly; everything else goes to the agents
+        result = run_fast_path(session_id, text, dataset_path, recorder)
+        if result is None:
+            budget.check()
+            result = run_eda_workflow(session_id, text, dataset_path, data_preview, recorder, budget)
+
+        # Save the chat history and the final status together with the registered files
+        recorder.add_chat_history(result.get("chat_history", []))
+        recorder.flush(status="completed")
+        events.publish(session_id, "status", status="completed")
+        logger.info(f"Background analysis for session {session_id} completed successfully.")
+        return "completed"
+
+    except AnalysisCancelled as e:
+        logger.info(f"Background analysis for session {session_id} cancelled: {e}")
+        try:
+            recorder.add_log("cancelled", str(e))
+            recorder.flush(status="cancelled")
+            events.publish(session_id, "status", status="cancelled", reason=str(e))
+        except Exception as flush_error:
+            logger.error(f"Failed to record cancellation for session {session_id}: {flush_error}")
+        return "cancelled"
+
+    except Exception as e:
+        logger.error(f"Background analysis failed for session {session_id}: {e}")
+        logger.error(traceback.format_exc())
+        # Try to update status to failed, keeping whatever the run registered before failing
+        try:
+            recorder.flush(status="failed")
+            events.publish(session_id, "status", status="failed", error=str(e))
+        except Exception as flush_error:
+            logger.error(f"Failed to record failure for session {session_id}: {flush_error}")
+        return "failed"
+    finally:
+        cancellation.finish_run(budget)
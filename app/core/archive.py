@@ -0,0 +1,147 @@
+import os
+import glob
+import hashlib
+import logging
+import tempfile
+import zipfile
+
+from app.core.dataset_cache import COLUMNAR_FILENAME
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIRECTORY = os.path.join(BASE_DIR, "data", "results")
+UPLOADS_DIRECTORY = os.path.join(BASE_DIR, "data", "uploads")
+
+CHUNK_SIZE = 64 * 1024
+
+# Cached archives of completed sessions live in the results directory under this prefix
+ARCHIVE_PREFIX = "session_archive_"
+ARCHIVE_TMP_PREFIX = ".archive-"  # Archives still being written
+
+# Formats that are already compressed: deflating them again costs CPU and saves nothing
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".xlsx", ".docx", ".pptx", ".zip", ".gz", ".parquet", ".pdf",
+}
+
+
+def session_files(session_id: str):
+    """(archive name, path) of every result and upload file of a session, in a stable order."""
+    files = []
+    for directory in (os.path.join(RESULTS_DIRECTORY, session_id), os.path.join(UPLOADS_DIRECTORY, session_id)):
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            # The columnar copy, its failure marker and cached archives are internal caches, not results (the
+            # profile lives in a subdirectory); *.tmp are partial writes, e.g. an archive being cached by another download
+            if name.startswith((COLUMNAR_FILENAME, ARCHIVE_PREFIX, ARCHIVE_TMP_PREFIX)) or name.endswith(".tmp"):
+                continue
+            if os.path.isfile(path):
+                files.append((name, path))
+    return files
+
+
+def compress_type(path: str) -> int:
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class _StreamBuffer:
+    """Write-only, unseekable target for ZipFile; the bytes written are drained as they arrive."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files):
+    """
+    Yield a zip archive of `files` piece by piece while it is being built, so nothing
+    is written to disk and the first bytes go out immediately.
+    """
+    buffer = _StreamBuffer()
+    # ZipFile falls back to data descriptors because the buffer can't seek
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for arcname, path in files:
+            info = zipfile.ZipInfo.from_file(path, arcname=arcname)
+            info.compress_type = compress_type(path)
+            with open(path, "rb") as source, archive.open(info, "w") as entry:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    # Central directory
+    yield buffer.drain()
+
+
+def manifest_hash(files) -> str:
+    """Content address of an archive: names, sizes and mtimes of everything in it."""
+    digest = hashlib.sha256()
+    for arcname, path in files:
+        stat = os.stat(path)
+        digest.update(f"{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:32]
+
+
+def cached_archive_path(session_id: str, digest: str) -> str:
+    return os.path.join(RESULTS_DIRECTORY, session_id, f"{ARCHIVE_PREFIX}{digest}.zip")
+
+
+def stream_and_cache_zip(files, target: str):
+    """
+    Stream the archive like stream_zip and keep a copy at `target` once it has been
+    sent completely. An interrupted download leaves nothing behind.
+    """
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=ARCHIVE_TMP_PREFIX, suffix=".tmp")
+    completed = False
+    try:
+        with os.fdopen(fd, "wb") as copy:
+            for data in stream_zip(files):
+                copy.write(data)
+                yield data
+        os.replace(tmp_path, target)
+        completed = True
+        logger.info(f"Cached session archive {target}")
+        _remove_archives(directory, keep=target)
+    finally:
+        if not completed and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _remove_archives(directory: str, keep: str = None):
+    for path in glob.glob(os.path.join(directory, f"{ARCHIVE_PREFIX}*.zip")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Failed to remove cached archive {path}: {e}")
+
+
+def invalidate(session_id: str):
+    """Drop the session's cached archives, e.g. after new result files were registered."""
+    _remove_archives(os.path.join(RESULTS_DIRECTORY, session_id))
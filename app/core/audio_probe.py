@@ -0,0 +1,25 @@
+import os
+import wave
+
+
+def clip_size(audio_file) -> int:
+    """Size in bytes of a seekable file object, leaving it rewound."""
+    audio_file.seek(0, os.SEEK_END)
+    size = audio_file.tell()
+    audio_file.seek(0)
+    return size
+
+
+def clip_duration(audio_file):
+    """
+    Duration in seconds read from the container header, or None when the format
+    can't be probed without decoding (only WAV headers are understood).
+    """
+    try:
+        with wave.open(audio_file, "rb") as wav:
+            rate = wav.getframerate()
+            return wav.getnframes() / rate if rate else None
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        audio_file.seek(0)
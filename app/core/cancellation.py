@@ -0,0 +1,120 @@
+import time
+import logging
+import threading
+
+import autogen
+
+from app.core.config import RUN_TIME_BUDGET_SECONDS, RUN_TOKEN_BUDGET
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a run once it has been cancelled or has used up its budget."""
+
+
+class RunBudget:
+    """
+    Cancellation token and wall-clock/token budget for one analysis run.
+    cancel() is safe from any thread; the run itself stops at its next check().
+    """
+
+    def __init__(self, session_id: str, time_budget: float = RUN_TIME_BUDGET_SECONDS, token_budget: int = RUN_TOKEN_BUDGET):
+        self.session_id = session_id
+        self.run_id = None
+        self.token_budget = token_budget
+        self.reason = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._on_cancel = []
+        self._agents = []
+        self._timer = None
+        if time_budget:
+            # Fires even while a code block or LLM call is in flight, so running code is killed on time
+            self._timer = threading.Timer(time_budget, self.cancel, [f"Time budget of {time_budget:.0f}s exceeded"])
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "Cancelled by user"):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks = list(self._on_cancel)
+        logger.info(f"Cancelling analysis for session {self.session_id}: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancel callback failed for session {self.session_id}: {e}")
+
+    def on_cancel(self, callback):
+        """Run callback on cancel, e.g. to kill in-flight code; immediately if already cancelled."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._on_cancel.append(callback)
+                return
+        callback()
+
+    def track_agents(self, agents):
+        """Count these agents' LLM usage against the token budget."""
+        self._agents = list(agents)
+
+    def tokens_used(self) -> int:
+        if not self._agents:
+            return 0
+        usage = autogen.gather_usage_summary(self._agents)["usage_excluding_cached_inference"]
+        return sum(v.get("total_tokens", 0) for v in usage.values() if isinstance(v, dict))
+
+    def check(self):
+        """Raise AnalysisCancelled if the run was cancelled or is over its token budget."""
+        if self.token_budget and not self.cancelled:
+            used = self.tokens_used()
+            if used > self.token_budget:
+                self.cancel(f"Token budget of {self.token_budget} exceeded ({used} tokens used)")
+        if self.cancelled:
+            raise AnalysisCancelled(self.reason)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        with self._lock:
+            self._on_cancel = []
+
+
+# Budgets of the runs active in this process, keyed by job id, so the worker can cancel a single job's run
+_active = {}
+_active_lock = threading.Lock()
+
+
+def start_run(session_id: str, run_id=None) -> RunBudget:
+    budget = RunBudget(session_id)
+    budget.run_id = run_id
+    if run_id is not None:
+        with _active_lock:
+            _active[run_id] = budget
+    return budget
+
+
+def finish_run(budget: RunBudget):
+    budget.close()
+    with _active_lock:
+        if _active.get(budget.run_id) is budget:
+            del _active[budget.run_id]
+
+
+def cancel_run(run_id, reason: str = "Cancelled by user") -> bool:
+    """Cancel the active run with this id. Returns False if it isn't running in this process."""
+    with _active_lock:
+        budget = _active.get(run_id)
+    if budget is None:
+        return False
+    budget.cancel(reason)
+    return True
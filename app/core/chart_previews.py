@@ -0,0 +1,105 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, features
+
+from app.core import events
+from app.core.config import CHART_THUMBNAIL_PX, CHART_WEB_PX, CHART_PREVIEW_FORMAT, CHART_PREVIEW_WORKERS
+from app.database.persistence import RunRecorder
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kept in a subdirectory so the results scan and the zip download don't pick them up
+PREVIEW_DIRNAME = "previews"
+
+# File type -> (suffix, longest side in pixels)
+VARIANTS = {
+    "visualization_thumbnail": ("thumb", CHART_THUMBNAIL_PX),
+    "visualization_web": ("web", CHART_WEB_PX),
+}
+
+# Pillow resizes and encodes without holding the GIL, so threads run in parallel
+_executor = ThreadPoolExecutor(max_workers=CHART_PREVIEW_WORKERS, thread_name_prefix="chart-previews")
+
+
+def _preview_format() -> str:
+    if CHART_PREVIEW_FORMAT == "webp" and features.check("webp"):
+        return "webp"
+    return "png"
+
+
+def variant_path(png_path: str, suffix: str, extension: str) -> str:
+    directory, filename = os.path.split(png_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, PREVIEW_DIRNAME, f"{stem}.{suffix}.{extension}")
+
+
+def render_variants(png_path: str):
+    """Write every variant of one chart. Returns [(file_type, path)]."""
+    extension = _preview_format()
+    written = []
+    with Image.open(png_path) as image:
+        image.load()
+        for file_type, (suffix, size) in VARIANTS.items():
+            target = variant_path(png_path, suffix, extension)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)  # Never upscales
+            if extension == "webp":
+                variant.save(target, "WEBP", quality=80, method=4)
+            else:
+                variant.save(target, "PNG", optimize=True)
+            written.append((file_type, target))
+    return written
+
+
+def _previews_current(png_path: str, extension: str) -> bool:
+    """True if every variant exists and was written after the chart last changed, e.g. by an earlier run."""
+    chart_mtime = os.stat(png_path).st_mtime_ns
+    for suffix, _ in VARIANTS.values():
+        target = variant_path(png_path, suffix, extension)
+        if not os.path.exists(target) or os.stat(target).st_mtime_ns < chart_mtime:
+            return False
+    return True
+
+
+def generate_chart_previews(registered_files, recorder: RunRecorder):
+    """
+    Post-processing after file registration: render thumbnail and web-sized copies of
+    each chart that is new or changed since its previews were made, and register them
+    with their own file types. Charts from earlier runs keep the previews registered then.
+    """
+    extension = _preview_format()
+    charts = [
+        f["path"] for f in registered_files
+        if f["type"] == "visualization"
+        and os.path.basename(os.path.dirname(f["path"])) != PREVIEW_DIRNAME
+        and not _previews_current(f["path"], extension)
+    ]
+    futures = {path: _executor.submit(render_variants, path) for path in charts}
+
+    previews = []
+    for path, future in futures.items():
+        try:
+            variants = future.result()
+        except Exception as e:
+            # The full-size chart is still there; the gallery falls back to it
+            logger.warning(f"Failed to render previews for {path}: {e}")
+            continue
+        for file_type, variant in variants:
+            recorder.add_file(file_type, variant)
+            previews.append({"filename": os.path.basename(variant), "type": file_type, "path": variant})
+
+    # Rows first, then the events, so the announced URLs can be fetched right away
+    recorder.flush_files()
+    for preview in previews:
+        events.publish(
+            recorder.session_id, "file",
+            filename=preview["filename"], file_type=preview["type"],
+            url=f"/data/results/{recorder.session_id}/{preview['filename']}",
+        )
+    logger.info(f"Rendered {len(previews)} chart previews for session {recorder.session_id}")
+    return previews
@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from app.core import dataset_cache
+from app.core.config import CHART_RENDER_WORKERS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FRAMES_PER_WORKER = 2  # Datasets each render worker keeps parsed between charts
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Worker process state
+_frames = {}  # (path, mtime_ns) -> DataFrame
+_namespace = {}
+
+
+def _watch_parent(parent_pid: int):
+    # Exit with the analysis worker instead of lingering if it is terminated
+    while True:
+        time.sleep(1)
+        if os.getppid() != parent_pid:
+            os._exit(0)
+
+
+def _load_libraries():
+    """Import matplotlib (Agg) and seaborn into the namespace chart bodies run in."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    _namespace.update({"pd": pd, "plt": plt, "Figure": Figure})
+    try:
+        import seaborn as sns
+        _namespace["sns"] = sns
+    except ImportError:
+        pass
+
+
+def _warm_worker(parent_pid: int):
+    """Pool initializer: pay the matplotlib/seaborn import cost once per worker, not per chart."""
+    _load_libraries()
+    # Only pool workers may exit with their parent; the in-process fallback must never start this
+    threading.Thread(target=_watch_parent, args=(parent_pid,), name="render-parent-watch", daemon=True).start()
+
+
+def _load_frame(data_path: str, upload: bool = False) -> pd.DataFrame:
+    key = (data_path, os.stat(data_path).st_mtime_ns)
+    if key not in _frames:
+        file_type = os.path.splitext(data_path)[1]
+        if upload:
+            # Read from the upload's Parquet copy, much faster than the source file
+            df = dataset_cache.read_dataset(data_path, file_type)
+        else:
+            # Result files such as cleaned data are rewritten by later runs: no Parquet copy in the results dir
+            df = dataset_cache.read_source(data_path, file_type)
+        while len(_frames) >= FRAMES_PER_WORKER:
+            _frames.pop(next(iter(_frames)))
+        _frames[key] = df
+    return _frames[key]
+
+
+def draw_chart(df: pd.DataFrame, body: str, png_path: str):
+    """Execute a chart body against df on a fresh figure and save it as a PNG."""
+    if "Figure" not in _namespace:
+        _load_libraries()  # In-process fallback, outside the pool
+    # Figure objects don't touch pyplot's global state, so this is safe in threads too
+    figure = _namespace["Figure"](figsize=(10, 6))
+    ax = figure.subplots()
+    exec(body, {**_namespace, "df": df, "ax": ax, "fig": figure})
+    figure.savefig(png_path, bbox_inches="tight", dpi=300)
+
+
+def _render(spec: dict) -> str:
+    draw_chart(_load_frame(spec["data_path"], spec.get("upload", False)), spec["body"], spec["png_path"])
+    if spec.get("code_path"):
+        with open(spec["code_path"], "w") as f:
+            f.write(spec["code"])
+    return spec["png_path"]
+
+
+def _ping():
+    return os.getpid()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=CHART_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                initargs=(os.getpid(),),
+            )
+        return _pool
+
+
+def warm_up():
+    """Start every render worker now so the first charts don't wait for interpreter startup."""
+    pool = get_pool()
+    for future in [pool.submit(_ping) for _ in range(CHART_RENDER_WORKERS)]:
+        future.result()
+    logger.info(f"Chart render pool ready with {CHART_RENDER_WORKERS} workers")
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def render_charts(specs):
+    """
+    Render charts in parallel on the warm pool. Each spec has `body` (code drawing on
+    `ax` from `df`), `data_path` and `png_path`, plus optional `code_path`/`code` to
+    save alongside and `upload` (True when data_path is the uploaded dataset, which is
+    read through its columnar copy). Returns the PNG paths; the first failing chart raises.
+    """
+    global _pool
+    if not specs:
+        return []
+    started = time.perf_counter()
+    try:
+        pool = get_pool()
+        paths = [future.result() for future in [pool.submit(_render, spec) for spec in specs]]
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory): start a fresh pool next time, finish these here
+        logger.warning("Chart render pool broke, rendering in-process")
+        with _pool_lock:
+            _pool = None
+        paths = [_render(spec) for spec in specs]
+    logger.info(f"Rendered {len(specs)} charts in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return paths
@@ -8,6 +8,122 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_DIR = os.path.join(BASE_DIR, "..", "database")
 os.makedirs(DB_DIR, exist_ok=True)
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(DB_DIR, 'eda_database.db')}")
+# Engine profile picked from the URL scheme ("postgresql+psycopg2://..." -> "postgresql"), "default" for anything else
+DATABASE_BACKEND = DATABASE_URL.split(":", 1)[0].split("+", 1)[0].lower()
+DATABASE_PROFILE = DATABASE_BACKEND if DATABASE_BACKEND in ("sqlite", "postgresql") else "default"
+
+# SQLite tuning (applied on every new connection)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Connection pool for server databases (Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
 
 # API Keys
 GROQ_API_KEY = os.getenv("GROQ_API_KEY1")
+
+# Dataset cache: upper bound on memory held by parsed DataFrames (bytes)
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Rows per chunk when an upload is converted to its Parquet copy
+COLUMNAR_CHUNK_ROWS = int(os.getenv("COLUMNAR_CHUNK_ROWS", "100000"))
+
+# Number of rows returned in the analyze preview table
+PREVIEW_ROWS = int(os.getenv("PREVIEW_ROWS", "10"))
+
+# Speech-to-text (Groq Whisper) client
+GROQ_TRANSCRIPTION_URL = os.getenv("GROQ_TRANSCRIPTION_URL", "https://api.groq.com/openai/v1/audio/transcriptions")
+TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "whisper-large-v3")
+TRANSCRIPTION_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", "60"))
+TRANSCRIPTION_MAX_RETRIES = int(os.getenv("TRANSCRIPTION_MAX_RETRIES", "3"))
+TRANSCRIPTION_MAX_CONCURRENCY = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", "8"))
+
+# Voice uploads: stream the upload spool straight to transcription instead of copying it to disk
+VOICE_STREAM_UPLOADS = os.getenv("VOICE_STREAM_UPLOADS", "true").lower() == "true"
+# Reject clips above these limits before anything is sent upstream (0 disables the check)
+VOICE_MAX_BYTES = int(os.getenv("VOICE_MAX_BYTES", str(25 * 1024 * 1024)))
+VOICE_MAX_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "0"))
+
+# Local caches (SQLite files under app/data/cache)
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+TRANSCRIPTION_CACHE_ENABLED = os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPTION_CACHE_TTL_SECONDS = int(os.getenv("TRANSCRIPTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Analysis job queue
+JOB_WORKERS_EMBEDDED = os.getenv("JOB_WORKERS_EMBEDDED", "true").lower() == "true"  # Start workers with the API
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "1"))  # Jobs run at once per worker process
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))  # Running jobs without a heartbeat this long are requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Generated code runs in a per-run scratch directory created under this one
+CODING_DIR = os.getenv("CODING_DIR", os.path.join(BASE_DIR, "..", "coding"))
+
+# OpenAI-compatible endpoint used by the agents (override to point at a local mock server)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+
+# Answer common requests (missing values, summaries, cleaning, standard charts) without the agents
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# Rows per chunk when profiling a dataset
+PROFILE_CHUNK_ROWS = int(os.getenv("PROFILE_CHUNK_ROWS", "100000"))
+
+# Progress stream (/events, /ws): keepalive interval, also how often the DB status is re-checked
+# in case events can't reach this process (e.g. standalone workers)
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Chart previews: downscaled copies of each generated chart for the results gallery
+CHART_THUMBNAIL_PX = int(os.getenv("CHART_THUMBNAIL_PX", "320"))  # Longest side
+CHART_WEB_PX = int(os.getenv("CHART_WEB_PX", "1280"))
+CHART_PREVIEW_FORMAT = os.getenv("CHART_PREVIEW_FORMAT", "webp").lower()  # "webp" or "png"
+CHART_PREVIEW_WORKERS = int(os.getenv("CHART_PREVIEW_WORKERS", "4"))
+
+# Chart rendering: warm worker processes with matplotlib (Agg) and seaborn already imported
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# LLM completion cache (SQLite under CACHE_DIR), keyed on model, parameters and the compacted messages
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Context compaction before each agent reply
+CONTEXT_COMPACTION_ENABLED = os.getenv("CONTEXT_COMPACTION_ENABLED", "true").lower() == "true"
+COMPACTION_KEEP_RECENT = int(os.getenv("COMPACTION_KEEP_RECENT", "8"))  # Latest messages kept verbatim
+COMPACTION_OLD_MESSAGE_CHARS = int(os.getenv("COMPACTION_OLD_MESSAGE_CHARS", "400"))  # Older messages are cut to this
+COMPACTION_MAX_OUTPUT_CHARS = int(os.getenv("COMPACTION_MAX_OUTPUT_CHARS", "2000"))  # Code execution output, any age
+
+# Agent orchestration: "state_machine" follows a fixed stage order without LLM speaker selection,
+# "auto" lets the GroupChatManager's LLM pick each speaker
+ORCHESTRATION_MODE = os.getenv("ORCHESTRATION_MODE", "state_machine").lower()
+ORCHESTRATION_MAX_FIX_ATTEMPTS = int(os.getenv("ORCHESTRATION_MAX_FIX_ATTEMPTS", "2"))  # Retries after failed code per stage
+
+# LLM key pool: every configured Groq key serves every agent, scheduled by per-key rate budgets
+LLM_API_KEYS = [
+    key for key in dict.fromkeys(
+        [k.strip() for k in os.getenv("GROQ_API_KEYS", "").split(",")]
+        + [os.getenv(f"GROQ_API_KEY{i}") for i in range(1, 5)]
+    )
+    if key
+]
+LLM_KEY_POOL_ENABLED = os.getenv("LLM_KEY_POOL_ENABLED", "true").lower() == "true"
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))  # Per key
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))  # Per key
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "120"))  # Longest a call waits for a key
+
+# Persistent execution kernel for agent code: one warm Python process per run
+KERNEL_ENABLED = os.getenv("KERNEL_ENABLED", "true").lower() == "true"
+KERNEL_BLOCK_TIMEOUT_SECONDS = float(os.getenv("KERNEL_BLOCK_TIMEOUT_SECONDS", "120"))
+KERNEL_STARTUP_TIMEOUT_SECONDS = float(os.getenv("KERNEL_STARTUP_TIMEOUT_SECONDS", "120"))
+KERNEL_MEMORY_LIMIT_MB = int(os.getenv("KERNEL_MEMORY_LIMIT_MB", "4096"))  # Address space limit, 0 disables
+
+# Run budgets and cancellation: a run over budget stops between agent rounds with status "cancelled"
+RUN_TIME_BUDGET_SECONDS = float(os.getenv("RUN_TIME_BUDGET_SECONDS", "1800"))  # Wall clock per analysis, 0 disables
+RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", "0"))  # LLM tokens sent per analysis (cache hits are free), 0 disables
+JOB_CANCEL_POLL_SECONDS = float(os.getenv("JOB_CANCEL_POLL_SECONDS", "1.0"))  # How often workers look for cancel requests
+CANCEL_WAIT_SECONDS = float(os.getenv("CANCEL_WAIT_SECONDS", "30"))  # How long /delete waits for a running analysis to stop
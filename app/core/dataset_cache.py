@@ -0,0 +1,286 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from app.core.config import DATASET_CACHE_MAX_BYTES, COLUMNAR_CHUNK_ROWS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columnar copy of the upload, stored next to it in data/uploads/<session_id>
+COLUMNAR_FILENAME = "dataset.parquet"
+# Written instead when the upload can't be stored as Parquet, so the conversion isn't retried on every read
+COLUMNAR_FAILED_FILENAME = COLUMNAR_FILENAME + ".failed"
+MAX_SCHEMA_PASSES = 3  # Conversion passes over the source before giving up on column types that keep widening
+
+
+def is_json_lines(dataset_path: str) -> bool:
+    """True if a .json upload holds one record per line rather than a single document."""
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        first_line = f.readline().strip()
+        if not first_line.startswith("{"):
+            return False
+        try:
+            json.loads(first_line)
+        except ValueError:
+            return False
+        # A single one-line object is a normal JSON document
+        return any(line.strip() for line in f)
+
+
+def _read_json(dataset_path: str) -> pd.DataFrame:
+    return pd.read_json(dataset_path, lines=is_json_lines(dataset_path))
+
+
+_READERS = {
+    ".csv": pd.read_csv,
+    ".xlsx": pd.read_excel,
+    ".json": _read_json,
+}
+
+# session_id -> (DataFrame, approximate size in bytes), most recently used last
+_frames = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+
+
+def columnar_path(dataset_path: str) -> str:
+    """Path of the Parquet copy for an uploaded dataset."""
+    return os.path.join(os.path.dirname(dataset_path), COLUMNAR_FILENAME)
+
+
+def read_source(dataset_path: str, file_type: str) -> pd.DataFrame:
+    """Parse the original uploaded file."""
+    reader = _READERS.get(file_type)
+    if reader is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return reader(dataset_path)
+
+
+def iter_source_chunks(dataset_path: str, file_type: str, chunk_rows: int):
+    """Yield the original uploaded file as DataFrames of at most chunk_rows rows, without parsing it whole."""
+    if file_type == ".csv":
+        yield from pd.read_csv(dataset_path, chunksize=chunk_rows)
+    elif file_type == ".json" and is_json_lines(dataset_path):
+        yield from pd.read_json(dataset_path, lines=True, chunksize=chunk_rows)
+    elif file_type == ".json":
+        from app.core.preview import iter_json_array  # preview imports this module
+
+        records = []
+        for record in iter_json_array(dataset_path):
+            records.append(record)
+            if len(records) == chunk_rows:
+                yield pd.DataFrame(records)
+                records = []
+        if records:
+            yield pd.DataFrame(records)
+    elif file_type == ".xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(dataset_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = list(next(rows, ()))
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == chunk_rows:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def _failure_marker(dataset_path: str) -> str:
+    return os.path.join(os.path.dirname(dataset_path), COLUMNAR_FAILED_FILENAME)
+
+
+def _record_failure(dataset_path: str, error: Exception):
+    # Mixed-type columns etc. can't always be stored as Parquet; readers fall back to the source file
+    logger.warning(f"Failed to convert {dataset_path} to Parquet: {error}")
+    try:
+        with open(_failure_marker(dataset_path), "w") as f:
+            f.write(str(error))
+    except OSError as e:
+        logger.warning(f"Failed to record the failed conversion of {dataset_path}: {e}")
+
+
+def _tmp_path(target: str) -> str:
+    # Unique per writer: the upload task, the API and analysis workers may all convert at once
+    return f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _write_columnar(df: pd.DataFrame, dataset_path: str):
+    """Persist df as the dataset's Parquet copy. Returns the path, or None if it can't be stored."""
+    target = columnar_path(dataset_path)
+    tmp_path = _tmp_path(target)
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, target)
+        logger.info(f"Wrote columnar copy of {dataset_path} to {target}")
+        return target
+    except Exception as e:
+        _record_failure(dataset_path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+class _SchemaChanged(Exception):
+    """A later chunk needs wider column types than the ones already written."""
+
+    def __init__(self, schema):
+        super().__init__("column types changed between chunks")
+        self.schema = schema
+
+
+def _conform(table, schema):
+    """Cast a chunk to the file's schema, adding columns the chunk doesn't have as nulls."""
+    import pyarrow as pa
+
+    columns = [
+        table.column(field.name) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, names=schema.names).cast(schema)
+
+
+def _write_chunks(dataset_path: str, file_type: str, tmp_path: str, schema=None):
+    """One pass over the source, appending each chunk as a row group. Raises _SchemaChanged to restart."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in iter_source_chunks(dataset_path, file_type, COLUMNAR_CHUNK_ROWS):
+            table = pa.Table.from_pandas(chunk, preserve_index=False).replace_schema_metadata(None)
+            if schema is None:
+                schema = table.schema
+            elif not table.schema.equals(schema):
+                # e.g. an integer column whose first missing value is in this chunk becomes a float column
+                merged = pa.unify_schemas([schema, table.schema], promote_options="permissive")
+                if not merged.equals(schema):
+                    raise _SchemaChanged(merged)
+                table = _conform(table, schema)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("dataset has no columns")
+
+
+def convert_to_columnar(dataset_path: str, file_type: str):
+    """
+    Convert an uploaded dataset to Parquet once, so later reads skip the text parser.
+    The source is read in chunks of COLUMNAR_CHUNK_ROWS rows, so memory stays bounded
+    however large the upload is. A failed conversion is recorded and not retried.
+    Returns the Parquet path, or None if the dataset could not be converted.
+    """
+    target = columnar_path(dataset_path)
+    if os.path.exists(target):
+        return target
+    if os.path.exists(_failure_marker(dataset_path)):
+        return None
+
+    tmp_path = _tmp_path(target)
+    schema = None
+    try:
+        for _ in range(MAX_SCHEMA_PASSES):
+            try:
+                _write_chunks(dataset_path, file_type, tmp_path, schema)
+                break
+            except _SchemaChanged as e:
+                schema = e.schema  # Start over with the wider types
+        else:
+            raise ValueError(f"column types still changing after {MAX_SCHEMA_PASSES} passes")
+        os.replace(tmp_path, target)
+    except Exception as e:
+        _record_failure(dataset_path, e)
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logger.info(f"Wrote columnar copy of {dataset_path} to {target}")
+    return target
+
+
+def read_dataset(dataset_path: str, file_type: str) -> pd.DataFrame:
+    """
+    Parse a dataset from its Parquet copy. The copy is the cache shared by every process
+    (API, analysis workers, chart renderers): whoever parses the source file first writes
+    it, so each upload goes through the text parser once. Uploads whose conversion failed
+    are parsed from the source without trying again.
+    """
+    parquet_path = columnar_path(dataset_path)
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    df = read_source(dataset_path, file_type)
+    if not os.path.exists(_failure_marker(dataset_path)):
+        _write_columnar(df, dataset_path)
+    return df
+
+
+def load_dataset(session_id: str, dataset_path: str, file_type: str) -> pd.DataFrame:
+    """
+    Return the session's DataFrame, from this process's memory if possible, otherwise
+    through read_dataset. The returned frame is shared: do not mutate it.
+    """
+    df = get_cached(session_id)
+    if df is not None:
+        return df
+
+    df = read_dataset(dataset_path, file_type)
+    _remember(session_id, df)
+    return df
+
+
+def get_cached(session_id: str):
+    """Return the session's DataFrame if it is already in memory, without loading it."""
+    with _lock:
+        entry = _frames.get(session_id)
+        if entry is None:
+            return None
+        _frames.move_to_end(session_id)
+        return entry[0]
+
+
+def _remember(session_id: str, df: pd.DataFrame):
+    global _total_bytes
+    size = int(df.memory_usage(deep=True).sum())
+    if size > DATASET_CACHE_MAX_BYTES:
+        logger.info(f"Dataset for session {session_id} ({size} bytes) exceeds cache budget, not cached")
+        return
+
+    with _lock:
+        previous = _frames.pop(session_id, None)
+        if previous is not None:
+            _total_bytes -= previous[1]
+        _frames[session_id] = (df, size)
+        _total_bytes += size
+
+        # Evict least recently used frames until we are back under budget
+        while _total_bytes > DATASET_CACHE_MAX_BYTES and len(_frames) > 1:
+            evicted_id, (_, evicted_size) = _frames.popitem(last=False)
+            _total_bytes -= evicted_size
+            logger.info(f"Evicted dataset for session {evicted_id} from cache")
+
+
+def invalidate(session_id: str):
+    """Drop a session's DataFrame from memory."""
+    global _total_bytes
+    with _lock:
+        entry = _frames.pop(session_id, None)
+        if entry is not None:
+            _total_bytes -= entry[1]
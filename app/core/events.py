@@ -0,0 +1,94 @@
+import queue
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Events waiting for a slow listener; beyond this the oldest are dropped
+LISTENER_QUEUE_SIZE = 1000
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class EventBus:
+    """
+    In-process pub/sub for per-session progress events. publish() can be called from
+    any thread; each listener gets its own asyncio queue on its own event loop.
+    """
+
+    def __init__(self):
+        self._listeners = defaultdict(set)  # session_id -> {(loop, asyncio.Queue)}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id: str) -> asyncio.Queue:
+        listener = asyncio.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        with self._lock:
+            self._listeners[session_id].add((asyncio.get_running_loop(), listener))
+        return listener
+
+    def unsubscribe(self, session_id: str, listener: asyncio.Queue):
+        with self._lock:
+            listeners = self._listeners.get(session_id, set())
+            listeners.difference_update({entry for entry in listeners if entry[1] is listener})
+            if not listeners:
+                self._listeners.pop(session_id, None)
+
+    def publish(self, event: dict):
+        with self._lock:
+            listeners = list(self._listeners.get(event["session_id"], ()))
+        for loop, listener in listeners:
+            try:
+                loop.call_soon_threadsafe(_offer, listener, event)
+            except RuntimeError:
+                pass  # Listener's loop already closed
+
+    def listener_count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._listeners.get(session_id, ()))
+
+
+def _offer(listener: asyncio.Queue, event: dict):
+    if listener.full():
+        listener.get_nowait()
+    listener.put_nowait(event)
+
+
+bus = EventBus()
+
+# Set in worker processes: events go to the supervisor, which republishes them on its bus
+_forward_queue = None
+
+
+def set_forward_queue(forward_queue):
+    global _forward_queue
+    _forward_queue = forward_queue
+
+
+def publish(session_id: str, event_type: str, **data):
+    """Publish a "status", "message" or "file" event for a session. Never raises."""
+    event = {"type": event_type, "session_id": session_id, **data}
+    try:
+        if _forward_queue is not None:
+            _forward_queue.put_nowait(event)
+        else:
+            bus.publish(event)
+    except Exception as e:
+        logger.warning(f"Dropped {event_type} event for session {session_id}: {e}")
+
+
+def relay(forward_queue, stop: threading.Event):
+    """Supervisor side: republish events sent by worker processes until stopped."""
+    while not stop.is_set():
+        try:
+            event = forward_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        except (EOFError, OSError):
+            break
+        if event is None:
+            break
+        bus.publish(event)
@@ -0,0 +1,346 @@
+import os
+import re
+import logging
+import traceback
+
+import pandas as pd
+
+from app.core import dataset_cache, events
+from app.core.agent_service import RESULTS_DIR, register_result_files, save_graph_data
+from app.core.chart_previews import generate_chart_previews
+from app.core.chart_renderer import render_charts
+from app.core.config import FAST_PATH_ENABLED
+from app.database.persistence import RunRecorder
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Request phrases the fast path understands. Anything else goes to the agents.
+_TASK_PATTERNS = {
+    "missing": re.compile(r"\b(missing|null|nulls|nan|empty)\b"),
+    "describe": re.compile(r"\b(describe|description|summary|summarize|summarise|statistics|stats|overview|dtypes|data types|types)\b"),
+    "clean": re.compile(r"\b(clean|cleaning|cleaned|remove|drop|fill|impute|handle)\b"),
+}
+_CHART_PATTERNS = {
+    "histogram": re.compile(r"\b(histograms?|distributions?)\b"),
+    "bar": re.compile(r"\bbar( chart| graph| plot)?s?\b"),
+    "pie": re.compile(r"\bpie( chart| graph)?s?\b"),
+    "line": re.compile(r"\bline( chart| graph| plot)s?\b"),
+    "scatter": re.compile(r"\bscatter( ?plot| chart| graph)?s?\b"),
+}
+# Filler words that may appear around a supported request without changing it
+_FILLER_WORDS = {
+    "a", "all", "an", "any", "are", "against", "by", "can", "chart", "charts", "check", "column", "columns",
+    "count", "counts", "create", "data", "dataset", "display", "do", "draw", "each", "file", "find", "for",
+    "generate", "get", "give", "graph", "graphs", "i", "in", "is", "it", "like", "list", "make", "me",
+    "of", "on", "per", "please", "plot", "plots", "show", "table", "the", "there", "this", "to", "value",
+    "values", "versus", "vs", "want", "what", "with", "would", "you",
+}
+_CLAUSE_SPLIT = re.compile(r"\band\b|\bthen\b|\balso\b|[,;.]")
+
+# Chart bodies draw on `ax` from `df`; the same text is saved as the chart's *_code.py
+_CHART_BODIES = {
+    "histogram": """ax.hist(df[{x!r}].dropna(), bins=30, color="steelblue", edgecolor="black")
+ax.set_title({title!r})
+ax.set_xlabel({x!r})
+ax.set_ylabel("Frequency")
+""",
+    "bar": """counts = df[{x!r}].value_counts().head(20)
+ax.bar(counts.index.astype(str), counts.values, color="steelblue")
+ax.set_title({title!r})
+ax.set_xlabel({x!r})
+ax.set_ylabel("Count")
+ax.tick_params(axis="x", rotation=45)
+""",
+    "pie": """counts = df[{x!r}].value_counts()
+if len(counts) > 10:
+    counts = pd.concat([counts.head(9), pd.Series({{"Other": counts.iloc[9:].sum()}})])
+ax.pie(counts.values, labels=counts.index.astype(str), autopct="%1.1f%%", startangle=90)
+ax.set_title({title!r})
+ax.axis("equal")
+""",
+    "line": """data = df[[{x!r}, {y!r}]].dropna().sort_values({x!r})
+ax.plot(data[{x!r}], data[{y!r}], marker="o")
+ax.set_title({title!r})
+ax.set_xlabel({x!r})
+ax.set_ylabel({y!r})
+""",
+    "line_index": """ax.plot(df.index, df[{x!r}])
+ax.set_title({title!r})
+ax.set_xlabel("Row")
+ax.set_ylabel({x!r})
+""",
+    "scatter": """ax.scatter(df[{x!r}], df[{y!r}], alpha=0.6)
+ax.set_title({title!r})
+ax.set_xlabel({x!r})
+ax.set_ylabel({y!r})
+""",
+}
+_CHART_SUFFIXES = {
+    "histogram": "histogram",
+    "bar": "bar_chart",
+    "pie": "pie_chart",
+    "line": "line_chart",
+    "scatter": "scatter_plot",
+}
+_CHART_CODE_TEMPLATE = """import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+df = {read_data}
+fig, ax = plt.subplots(figsize=(10, 6))
+{body}
+fig.savefig({png_path!r}, bbox_inches="tight", dpi=300)
+plt.close(fig)
+"""
+_READERS = {".csv": "read_csv", ".xlsx": "read_excel", ".json": "read_json"}
+_WRITERS = {
+    ".csv": lambda df, path: df.to_csv(path, index=False),
+    ".xlsx": lambda df, path: df.to_excel(path, index=False),
+    ".json": lambda df, path: df.to_json(path, orient="records"),
+}
+
+
+def _chart_code(data_path: str, file_type: str, body: str, png_path: str) -> str:
+    """Standalone script saved next to a chart; it reads data_path the way dataset_cache does."""
+    read_data = f"pd.{_READERS[file_type]}({data_path!r})"
+    if file_type == ".json" and dataset_cache.is_json_lines(data_path):
+        read_data = f"pd.read_json({data_path!r}, lines=True)"
+    return _CHART_CODE_TEMPLATE.format(read_data=read_data, body=body.rstrip(), png_path=png_path)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def _find_columns(clause: str, columns):
+    """Columns mentioned in a clause, in order of appearance, plus the clause with them removed."""
+    found = []
+    # Longest names first so "age group" wins over "age"
+    for column in sorted(columns, key=lambda c: len(str(c)), reverse=True):
+        name = _normalize(str(column))
+        if not name:
+            continue
+        match = re.search(rf"\b{re.escape(name)}s?\b", clause)
+        if match:
+            found.append((match.start(), column))
+            clause = clause[:match.start()] + " " + clause[match.end():]
+    return [column for _, column in sorted(found, key=lambda item: item[0])], clause
+
+
+def match_intents(text: str, columns):
+    """
+    Parse a request into fast-path tasks, or return None when any part of it
+    needs the agents. Tasks are dicts with a "kind" of "missing", "describe",
+    "clean" or "chart"; charts also carry "chart" and "columns".
+    """
+    intents = []
+    for raw_clause in _CLAUSE_SPLIT.split(text):
+        clause = _normalize(raw_clause)
+        if not clause:
+            continue
+
+        clause_columns, clause = _find_columns(clause, columns)
+        clause_intents = []
+        for kind, pattern in _TASK_PATTERNS.items():
+            if pattern.search(clause):
+                # Tasks run on the whole dataset; "drop the age column" or "missing values in age" need the agents
+                if clause_columns:
+                    return None
+                clause_intents.append({"kind": kind})
+                clause = pattern.sub(" ", clause)
+        for chart, pattern in _CHART_PATTERNS.items():
+            if pattern.search(clause):
+                clause_intents.append({"kind": "chart", "chart": chart, "columns": list(clause_columns)})
+                clause = pattern.sub(" ", clause)
+
+        # Anything left over that isn't filler means we don't fully understand the request
+        if set(clause.split()) - _FILLER_WORDS:
+            return None
+
+        if clause_intents:
+            intents.extend(clause_intents)
+        elif clause_columns and intents and intents[-1]["kind"] == "chart":
+            # "histogram of age and salary" -> the second clause only names columns
+            previous = intents[-1]
+            if previous["chart"] in ("scatter", "line") and len(previous["columns"]) < 2:
+                previous["columns"].extend(clause_columns)
+            else:
+                for column in clause_columns:
+                    intents.append({"kind": "chart", "chart": previous["chart"], "columns": [column]})
+        elif clause_columns:
+            return None
+
+    return intents or None
+
+
+def _plan_chart(intent: dict, df: pd.DataFrame):
+    """Turn a chart intent into (chart kind, x, y), or None if it doesn't fit the data."""
+    chart, chart_columns = intent["chart"], intent["columns"]
+    if not chart_columns:
+        return None
+    # Only scatter and line charts use a second column; "salary by gender" would lose the grouping
+    if len(chart_columns) > (2 if chart in ("line", "scatter") else 1):
+        return None
+    x = chart_columns[0]
+    y = chart_columns[1] if len(chart_columns) > 1 else None
+
+    if chart == "histogram":
+        # Histograms of categorical columns are really bar charts of their counts
+        if not pd.api.types.is_numeric_dtype(df[x]):
+            return "bar", x, None
+        return "histogram", x, None
+    if chart in ("bar", "pie"):
+        return chart, x, None
+    if chart == "line":
+        if y is None:
+            return ("line_index", x, None) if pd.api.types.is_numeric_dtype(df[x]) else None
+        return "line", x, y
+    if chart == "scatter":
+        if y is None or not (pd.api.types.is_numeric_dtype(df[x]) and pd.api.types.is_numeric_dtype(df[y])):
+            return None
+        return "scatter", x, y
+    return None
+
+
+def _slug(value) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_") or "column"
+
+
+def _chart_name(kind: str, x, y) -> str:
+    suffix = _CHART_SUFFIXES["line" if kind == "line_index" else kind]
+    if y is not None:
+        return f"{_slug(x)}_vs_{_slug(y)}_{suffix}"
+    return f"{_slug(x)}_{suffix}"
+
+
+def _chart_title(kind: str, x, y) -> str:
+    if kind == "histogram":
+        return f"Distribution of {x}"
+    if y is not None:
+        return f"{y} vs {x}"
+    return f"{x} counts" if kind in ("bar", "pie") else f"{x}"
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    """Deterministic cleaning: drop empty and duplicate rows, trim text, fill remaining gaps."""
+    cleaned = df.dropna(how="all").dropna(axis=1, how="all").drop_duplicates().copy()
+    for column in cleaned.columns:
+        series = cleaned[column]
+        if pd.api.types.is_numeric_dtype(series):
+            if series.isna().any():
+                cleaned[column] = series.fillna(series.median())
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            series = series.str.strip() if pd.api.types.is_string_dtype(series) else series
+            mode = series.mode(dropna=True)
+            cleaned[column] = series.fillna(mode.iloc[0]) if not mode.empty else series
+    return cleaned.reset_index(drop=True)
+
+
+def run_fast_path(session_id: str, prompt: str, dataset_path: str, recorder: RunRecorder):
+    """
+    Handle common requests with pandas and matplotlib directly, without the agents.
+    Writes and registers results exactly like run_eda_workflow and returns the same
+    shape of result, or None when the request needs the agents.
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+
+    file_type = os.path.splitext(dataset_path)[1]
+    if file_type not in _READERS:
+        return None
+
+    try:
+        df = dataset_cache.load_dataset(session_id, dataset_path, file_type)
+        intents = match_intents(prompt, list(df.columns))
+        if intents is None:
+            return None
+
+        charts = []
+        for intent in intents:
+            if intent["kind"] == "chart":
+                plan = _plan_chart(intent, df)
+                if plan is None:
+                    return None
+                charts.append(plan)
+
+        logger.info(f"Fast path handling session {session_id}: {[intent['kind'] for intent in intents]}")
+        kinds = {intent["kind"] for intent in intents}
+        session_results_dir = os.path.join(RESULTS_DIR, session_id)
+        os.makedirs(session_results_dir, exist_ok=True)
+        summary_lines = []
+
+        # Summary report: same file name the ReportAgent uses
+        if kinds & {"missing", "describe"}:
+            report_path = os.path.join(session_results_dir, "summary_report.xlsx")
+            with pd.ExcelWriter(report_path) as writer:
+                if "missing" in kinds:
+                    missing = pd.DataFrame({
+                        "missing_count": df.isna().sum(),
+                        "missing_percent": (df.isna().mean() * 100).round(2),
+                    })
+                    missing.to_excel(writer, sheet_name="Missing Values", index_label="column")
+                    with_missing = missing[missing["missing_count"] > 0]
+                    if with_missing.empty:
+                        summary_lines.append("No missing values found.")
+                    else:
+                        summary_lines.append("Missing values per column:\n" + with_missing.to_string())
+                if "describe" in kinds:
+                    df.describe(include="all").transpose().to_excel(writer, sheet_name="Summary Statistics", index_label="column")
+                    types = pd.DataFrame({"dtype": df.dtypes.astype(str), "non_null": df.notna().sum(), "unique": df.nunique()})
+                    types.to_excel(writer, sheet_name="Column Types", index_label="column")
+                    summary_lines.append(f"Dataset has {len(df)} rows and {len(df.columns)} columns:\n" + types.to_string())
+
+        # Cleaned data is saved in the same format as the original file, and charts use it
+        chart_data_path = dataset_path
+        if "clean" in kinds:
+            cleaned = _clean(df)
+            cleaned_path = os.path.join(session_results_dir, f"cleaned_data{file_type}")
+            _WRITERS[file_type](cleaned, cleaned_path)
+            chart_data_path = cleaned_path
+            summary_lines.append(f"Cleaned data: {len(df)} -> {len(cleaned)} rows, saved as {os.path.basename(cleaned_path)}.")
+
+        # All charts render at once on the warm render pool
+        specs = []
+        used_names = set()
+        for kind, x, y in charts:
+            name = _chart_name(kind, x, y)
+            base_name, counter = name, 2
+            while name in used_names:
+                name = f"{base_name}_{counter}"
+                counter += 1
+            used_names.add(name)
+
+            body = _CHART_BODIES[kind].format(x=x, y=y, title=_chart_title(kind, x, y))
+            png_path = os.path.join(session_results_dir, f"{name}.png")
+            specs.append({
+                "body": body,
+                "data_path": chart_data_path,
+                "upload": chart_data_path == dataset_path,
+                "png_path": png_path,
+                "code_path": os.path.join(session_results_dir, f"{name}_code.py"),
+                "code": _chart_code(chart_data_path, file_type, body, png_path),
+            })
+            summary_lines.append(f"Saved chart {name}.png")
+        render_charts(specs)
+
+        registered_files = register_result_files(session_results_dir, recorder)
+        generate_chart_previews(registered_files, recorder)
+        graph_data = {"line": [], "pie": []}
+        save_graph_data(session_results_dir, graph_data, recorder)
+
+        message = {"name": "FastPathEngine", "role": "assistant", "content": "\n\n".join(summary_lines)}
+        events.publish(session_id, "message", **message)
+        return {
+            "message": "EDA fast path completed.",
+            "results_path": session_results_dir,
+            "chat_history": [message],
+            "graph_data": graph_data,
+        }
+    except Exception as e:
+        # Anything unexpected is left to the agents
+        logger.warning(f"Fast path failed for session {session_id}, falling back to agents: {e}")
+        logger.warning(traceback.format_exc())
+        return None
@@ -0,0 +1,84 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+# Long-lived caching for URLs that change whenever the content does
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+ETAG_CACHE_SIZE = 4096
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_etags = OrderedDict()  # (path, size, mtime_ns) -> etag
+_etags_lock = threading.Lock()
+
+
+def strong_etag(path: str, stat: os.stat_result) -> str:
+    """Content hash of the file, remembered until its size or mtime changes."""
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _etags_lock:
+        if key in _etags:
+            _etags.move_to_end(key)
+            return _etags[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+
+    with _etags_lock:
+        _etags[key] = etag
+        while len(_etags) > ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return etag
+
+
+def content_version(path: str):
+    """Short version tag that changes whenever the file is rewritten (size and mtime), or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+
+
+def not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Conditional GET: If-None-Match wins over If-Modified-Since, as in RFC 9110."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def file_response(request: Request, path: str, immutable: bool = False, filename: str = None):
+    """
+    FileResponse with a strong ETag, Last-Modified and a 304 for matching conditional
+    requests. Range and If-Range are handled by FileResponse itself.
+    """
+    stat = os.stat(path)
+    etag = strong_etag(path, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, filename=filename, headers=headers, stat_result=stat)
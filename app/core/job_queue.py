@@ -0,0 +1,381 @@
+import os
+import time
+import socket
+import logging
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+
+from app.core.config import (
+    JOB_WORKER_PROCESSES,
+    JOB_WORKER_CONCURRENCY,
+    JOB_POLL_SECONDS,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_STALE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_CANCEL_POLL_SECONDS,
+    FAST_PATH_ENABLED,
+)
+from app.core import cancellation, events
+from app.database import database, migrations, models
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+# --- Queue operations (usable from the API and from workers) ---
+
+def enqueue(db, session_id: str, prompt: str, dataset_path: str, data_preview: str, priority: int = 0):
+    """Add an analysis to the queue. Higher priority runs first, FIFO within a priority."""
+    job = models.Job(
+        session_id=session_id,
+        prompt=prompt,
+        dataset_path=dataset_path,
+        data_preview=data_preview,
+        priority=priority,
+        status="queued",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_next_job(db, worker_id: str):
+    """
+    Atomically move the next queued job to "running" for this worker.
+    The conditional UPDATE makes claiming safe across processes.
+    """
+    for _ in range(5):
+        candidate = (
+            db.query(models.Job.id)
+            .filter(models.Job.status == "queued")
+            .order_by(models.Job.priority.desc(), models.Job.id)
+            .first()
+        )
+        if candidate is None:
+            return None
+
+        now = _utcnow()
+        claimed = (
+            db.query(models.Job)
+            .filter(models.Job.id == candidate.id, models.Job.status == "queued")
+            .update(
+                {
+                    models.Job.status: "running",
+                    models.Job.worker_id: worker_id,
+                    models.Job.started_at: now,
+                    models.Job.heartbeat_at: now,
+                    models.Job.attempts: models.Job.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if claimed:
+            return db.get(models.Job, candidate.id)
+        # Another worker took it first, try the next one
+    return None
+
+
+def cancel_session_jobs(db, session_id: str) -> int:
+    """
+    Cancel a session's queued jobs and flag its running ones.
+    Returns the number of jobs affected.
+    """
+    now = _utcnow()
+    cancelled = (
+        db.query(models.Job)
+        .filter(models.Job.session_id == session_id, models.Job.status == "queued")
+        .update({models.Job.status: "cancelled", models.Job.finished_at: now}, synchronize_session=False)
+    )
+    flagged = (
+        db.query(models.Job)
+        .filter(models.Job.session_id == session_id, models.Job.status == "running")
+        .update({models.Job.cancel_requested: True}, synchronize_session=False)
+    )
+    db.commit()
+    return cancelled + flagged
+
+
+def wait_for_session_jobs(session_id: str, timeout: float, interval: float = 0.5) -> bool:
+    """
+    Block until none of a session's jobs is running, e.g. after cancelling them.
+    Returns False if some were still running after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        db = database.SessionLocal()
+        try:
+            running = (
+                db.query(models.Job.id)
+                .filter(models.Job.session_id == session_id, models.Job.status == "running")
+                .first()
+            )
+        finally:
+            db.close()
+        if running is None:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def requeue_stale_jobs(db, stale_after: float = JOB_STALE_SECONDS) -> int:
+    """
+    Crash recovery: jobs left "running" by a worker that stopped heartbeating are
+    queued again, or failed once they have used up JOB_MAX_ATTEMPTS.
+    """
+    cutoff = _utcnow() - timedelta(seconds=stale_after)
+    stale_jobs = (
+        db.query(models.Job)
+        .filter(
+            models.Job.status == "running",
+            or_(models.Job.heartbeat_at.is_(None), models.Job.heartbeat_at < cutoff),
+        )
+        .all()
+    )
+    for job in stale_jobs:
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished_at = _utcnow()
+        elif job.attempts >= JOB_MAX_ATTEMPTS:
+            logger.error(f"Job {job.id} for session {job.session_id} failed after {job.attempts} attempts")
+            job.status = "failed"
+            job.error = "Worker stopped responding"
+            job.finished_at = _utcnow()
+            session = db.query(models.Session).filter(models.Session.session_id == job.session_id).first()
+            if session:
+                session.status = "failed"
+                events.publish(job.session_id, "status", status="failed")
+        else:
+            logger.warning(f"Requeueing job {job.id} for session {job.session_id} (worker {job.worker_id} stopped responding)")
+            job.status = "queued"
+            job.worker_id = None
+    db.commit()
+    return len(stale_jobs)
+
+
+# --- Worker process ---
+
+def _heartbeat(worker_id: str, running: dict, stop: threading.Event):
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        job_ids = list(running)
+        if not job_ids:
+            continue
+        db = database.SessionLocal()
+        try:
+            db.query(models.Job).filter(models.Job.id.in_(job_ids), models.Job.worker_id == worker_id).update(
+                {models.Job.heartbeat_at: _utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Heartbeat failed for worker {worker_id}: {e}")
+        finally:
+            db.close()
+
+
+def _watch_cancellations(running: dict, stop: threading.Event):
+    """Cancel the runs of this worker's jobs once the API flags them with cancel_requested."""
+    while not stop.wait(JOB_CANCEL_POLL_SECONDS):
+        job_ids = list(running)
+        if not job_ids:
+            continue
+        db = database.SessionLocal()
+        try:
+            flagged = (
+                db.query(models.Job.id)
+                .filter(models.Job.id.in_(job_ids), models.Job.cancel_requested.is_(True))
+                .all()
+            )
+        except Exception as e:
+            logger.warning(f"Cancel check failed: {e}")
+            flagged = []
+        finally:
+            db.close()
+        for (job_id,) in flagged:
+            cancellation.cancel_run(job_id)
+
+
+def _run_job(job_id: int, session_id: str, prompt: str, dataset_path: str, data_preview: str):
+    # Imported here so only worker processes load autogen and the agents
+    from app.core.analysis_runner import process_analysis
+
+    error = None
+    try:
+        status = process_analysis(session_id, prompt, dataset_path, data_preview, run_id=job_id)
+    except Exception as e:
+        logger.error(f"Job {job_id} crashed: {e}")
+        logger.error(traceback.format_exc())
+        status = "failed"
+        error = str(e)
+
+    db = database.SessionLocal()
+    try:
+        job = db.get(models.Job, job_id)
+        if job:
+            # The run's own outcome wins: a cancel that arrives after it finished changes nothing
+            job.status = status
+            job.error = error
+            job.finished_at = _utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+
+def _warm_chart_renderer():
+    from app.core import chart_renderer
+    try:
+        chart_renderer.warm_up()
+    except Exception as e:
+        logger.warning(f"Chart render pool failed to start: {e}")
+
+
+def worker_main(concurrency: int = JOB_WORKER_CONCURRENCY, event_queue=None):
+    """
+    Entry point of a worker process: claim jobs and run up to `concurrency` at a time.
+    Progress events are sent to the supervisor through `event_queue`.
+    """
+    events.set_forward_queue(event_queue)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Analysis worker {worker_id} started (concurrency {concurrency})")
+
+    running = {}  # job_id -> Future
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(worker_id, running, stop), daemon=True).start()
+    threading.Thread(target=_watch_cancellations, args=(running, stop), daemon=True).start()
+    if FAST_PATH_ENABLED:
+        # Start the chart render processes while waiting for the first job
+        threading.Thread(target=_warm_chart_renderer, daemon=True).start()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            while True:
+                for job_id, future in list(running.items()):
+                    if future.done():
+                        del running[job_id]
+
+                job = None
+                if len(running) < concurrency:
+                    db = database.SessionLocal()
+                    try:
+                        job = claim_next_job(db, worker_id)
+                    except Exception as e:
+                        logger.warning(f"Worker {worker_id} failed to claim a job: {e}")
+                    finally:
+                        db.close()
+
+                if job is None:
+                    time.sleep(JOB_POLL_SECONDS)
+                    continue
+
+                logger.info(f"Worker {worker_id} picked up job {job.id} for session {job.session_id}")
+                running[job.id] = executor.submit(
+                    _run_job, job.id, job.session_id, job.prompt, job.dataset_path, job.data_preview
+                )
+        finally:
+            stop.set()
+            from app.core import chart_renderer
+            chart_renderer.shutdown()
+
+
+# --- Supervisor ---
+
+class WorkerPool:
+    """
+    Runs analysis workers in separate processes, restarts the ones that die and
+    requeues jobs they left behind.
+    """
+
+    def __init__(self, processes: int = JOB_WORKER_PROCESSES, concurrency: int = JOB_WORKER_CONCURRENCY):
+        self.processes = processes
+        self.concurrency = concurrency
+        # Spawned (not forked) so workers don't inherit the API's DB connections and threads
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = []
+        self._stop = threading.Event()
+        self._monitor = None
+        # Progress events from the workers, republished on this process's event bus
+        self._events = self._context.Queue()
+        self._relay = None
+
+    def start(self):
+        self._recover()
+        for _ in range(self.processes):
+            self._workers.append(self._spawn())
+        self._monitor = threading.Thread(target=self._watch, name="job-supervisor", daemon=True)
+        self._monitor.start()
+        self._relay = threading.Thread(target=events.relay, args=(self._events, self._stop), name="job-events", daemon=True)
+        self._relay.start()
+        logger.info(f"Started {self.processes} analysis worker processes")
+
+    def _spawn(self):
+        process = self._context.Process(target=worker_main, args=(self.concurrency, self._events), name="analysis-worker")
+        process.start()
+        return process
+
+    def _recover(self):
+        db = database.SessionLocal()
+        try:
+            requeued = requeue_stale_jobs(db)
+            if requeued:
+                logger.info(f"Recovered {requeued} stale jobs")
+        except Exception as e:
+            logger.warning(f"Stale job recovery failed: {e}")
+        finally:
+            db.close()
+
+    def _watch(self):
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            for index, process in enumerate(self._workers):
+                if not process.is_alive():
+                    logger.warning(f"Analysis worker {process.pid} exited with code {process.exitcode}, restarting")
+                    self._workers[index] = self._spawn()
+            self._recover()
+
+    def stop(self):
+        self._stop.set()
+        for process in self._workers:
+            process.terminate()
+        for process in self._workers:
+            process.join(timeout=5)
+        self._workers = []
+        self._events.put(None)
+
+
+_pool = None
+
+
+def start_worker_pool():
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool()
+        _pool.start()
+    return _pool
+
+
+def stop_worker_pool():
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
+
+
+if __name__ == "__main__":
+    # Standalone workers: python -m app.core.job_queue (set JOB_WORKERS_EMBEDDED=false on the API)
+    migrations.run_migrations(database.engine)
+    pool = start_worker_pool()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_worker_pool()
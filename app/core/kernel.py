@@ -0,0 +1,194 @@
+import io
+import os
+import logging
+import traceback
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+
+from autogen.coding import CodeBlock, CodeResult, MarkdownCodeExtractor, LocalCommandLineCodeExecutor
+
+from app.core.config import (
+    KERNEL_BLOCK_TIMEOUT_SECONDS,
+    KERNEL_STARTUP_TIMEOUT_SECONDS,
+    KERNEL_MEMORY_LIMIT_MB,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PYTHON_LANGUAGES = {"python", "py", "python3", ""}
+TIMEOUT_EXIT_CODE = 124
+KILLED_EXIT_CODE = 137
+
+
+def _kernel_main(conn, work_dir: str, dataset_path: str, memory_limit_mb: int):
+    """Kernel process: import the data stack once, load the dataset as df, then run blocks as they arrive."""
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass  # Not supported on this platform
+    os.chdir(work_dir)
+
+    import numpy as np
+    import pandas as pd
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    namespace = {"__name__": "__main__", "np": np, "pd": pd, "plt": plt}
+    try:
+        import seaborn as sns
+        namespace["sns"] = sns
+    except ImportError:
+        pass
+
+    if dataset_path:
+        try:
+            from app.core import dataset_cache
+            # Plain reader: the kernel must not write cache files next to the dataset or in the work dir
+            namespace["df"] = dataset_cache.read_source(dataset_path, os.path.splitext(dataset_path)[1])
+        except Exception as e:
+            logger.warning(f"Kernel could not preload {dataset_path}: {e}")
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+        if code is None:
+            break
+        output = io.StringIO()
+        exit_code = 0
+        with redirect_stdout(output), redirect_stderr(output):
+            try:
+                exec(compile(code, "<agent code>", "exec"), namespace)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except BaseException as e:
+                exit_code = 1
+                # Drop this frame so the traceback starts in the agent's code
+                traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            finally:
+                plt.close("all")
+        conn.send((exit_code, output.getvalue()))
+
+
+class PythonKernel:
+    """
+    Long-lived Python process for one analysis run. Variables persist between blocks;
+    a block that times out or kills the process gets a fresh kernel for the next one.
+    """
+
+    def __init__(self, work_dir: str, dataset_path: str = None,
+                 timeout: float = KERNEL_BLOCK_TIMEOUT_SECONDS, memory_limit_mb: int = KERNEL_MEMORY_LIMIT_MB):
+        self.work_dir = work_dir
+        self.dataset_path = dataset_path
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._ready = False
+
+    def start(self):
+        """Start the process without waiting for it; imports and the dataset load overlap the first LLM call."""
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_kernel_main,
+            args=(child_conn, self.work_dir, self.dataset_path, self.memory_limit_mb),
+            name="analysis-kernel",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+
+    def _wait_ready(self):
+        if self._ready:
+            return
+        if not self._conn.poll(KERNEL_STARTUP_TIMEOUT_SECONDS):
+            raise RuntimeError("Execution kernel did not start in time")
+        self._conn.recv()
+        self._ready = True
+
+    def execute(self, code: str):
+        """Run one block. Returns (exit_code, output)."""
+        if self._process is None or not self._process.is_alive():
+            self.start()
+        try:
+            self._wait_ready()
+            self._conn.send(code)
+            if self._conn.poll(self.timeout):
+                return self._conn.recv()
+        except (EOFError, BrokenPipeError, OSError, RuntimeError) as e:
+            self._process.join(timeout=1)
+            exitcode = self._process.exitcode
+            self.stop()
+            return KILLED_EXIT_CODE, f"Execution kernel died (exit code {exitcode}), kernel restarted: {e!r}"
+        self.stop()
+        return TIMEOUT_EXIT_CODE, f"Timeout: code block did not finish within {self.timeout:.0f} seconds, kernel restarted"
+
+    def interrupt(self):
+        """Kill the process from another thread; a block in flight returns as failed."""
+        process = self._process
+        if process is not None and process.is_alive():
+            process.kill()
+
+    def stop(self):
+        """Kill the process; the next block starts a fresh one."""
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join(timeout=5)
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+        self._ready = False
+
+
+class KernelCodeExecutor:
+    """
+    autogen code executor running Python blocks in the run's PythonKernel; other
+    languages (e.g. shell) still go through a local command-line executor.
+    """
+
+    def __init__(self, work_dir: str, dataset_path: str = None):
+        self.kernel = PythonKernel(work_dir, dataset_path)
+        self.kernel.start()
+        self._extractor = MarkdownCodeExtractor()
+        self._shell = LocalCommandLineCodeExecutor(work_dir=work_dir, timeout=int(KERNEL_BLOCK_TIMEOUT_SECONDS))
+
+    @property
+    def code_extractor(self):
+        return self._extractor
+
+    def execute_code_blocks(self, code_blocks: list[CodeBlock]) -> CodeResult:
+        outputs = []
+        exit_code = 0
+        for block in code_blocks:
+            if block.language.lower() in PYTHON_LANGUAGES:
+                exit_code, output = self.kernel.execute(block.code)
+            else:
+                result = self._shell.execute_code_blocks([block])
+                exit_code, output = result.exit_code, result.output
+            outputs.append(output)
+            if exit_code != 0:
+                break
+        return CodeResult(exit_code=exit_code, output="".join(outputs))
+
+    def restart(self):
+        self.kernel.stop()
+        self.kernel.start()
+
+    def interrupt(self):
+        self.kernel.interrupt()
+
+    def stop(self):
+        self.kernel.stop()
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+
+from app.agents.compaction import normalize
+from app.core.cache_store import SqliteCache
+from app.core.config import CACHE_DIR, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shared by every run in this process
+store = SqliteCache(
+    os.path.join(CACHE_DIR, "llm_completions.sqlite"),
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+)
+
+# API latency seen by this process, used to estimate what cache hits saved
+_api_latency = {"seconds": 0.0, "calls": 0}
+
+
+def cache_key(request) -> str:
+    """
+    Hash of the request autogen passes as the key: model, sampling parameters and the
+    messages with whitespace-normalized content.
+    """
+    if isinstance(request, dict) and isinstance(request.get("messages"), list):
+        request = {
+            **request,
+            "messages": [
+                {**m, "content": normalize(m["content"])} if isinstance(m.get("content"), str) else m
+                for m in request["messages"]
+            ],
+        }
+    encoded = json.dumps(request, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RunLLMCache:
+    """
+    autogen cache (AbstractCache protocol) for one analysis run, backed by the shared
+    SQLite store. Counts hits and misses and times the calls that went to the API.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.call_seconds = 0.0
+        self._pending = {}  # key -> time of the miss
+
+    def get(self, key, default=None):
+        key = cache_key(key)
+        value = store.get(key)
+        if value is None:
+            self.misses += 1
+            self._pending[key] = time.perf_counter()
+            return default
+        try:
+            completion = pickle.loads(value)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable LLM cache entry: {e}")
+            self.misses += 1
+            self._pending[key] = time.perf_counter()
+            return default
+        self.hits += 1
+        return completion
+
+    def set(self, key, value):
+        key = cache_key(key)
+        started = self._pending.pop(key, None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            self.call_seconds += elapsed
+            _api_latency["seconds"] += elapsed
+            _api_latency["calls"] += 1
+        try:
+            store.set(key, pickle.dumps(value))
+        except Exception as e:
+            logger.warning(f"Failed to cache LLM completion: {e}")
+
+    def close(self):
+        pass  # The store stays open for the next run
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def stats(self) -> dict:
+        average = _api_latency["seconds"] / _api_latency["calls"] if _api_latency["calls"] else 0.0
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "api_seconds": round(self.call_seconds, 3),
+            # Each hit skipped a call that would have taken about as long as an average API call
+            "estimated_seconds_saved": round(self.hits * average, 3),
+        }
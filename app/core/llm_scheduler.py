@@ -0,0 +1,233 @@
+import re
+import json
+import time
+import logging
+import threading
+
+import httpx
+
+from app.core.config import (
+    LLM_API_KEYS,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_COOLDOWN_SECONDS = 1.0  # After a 429 without any reset hint
+DEFAULT_MAX_TOKENS = 1000
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value) -> float:
+    """Rate-limit reset values: "7.66s", "2m59.56s", "120ms" or plain seconds."""
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute`/60 per second, holding at most `per_minute`."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket, not forever
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def limit(self, remaining: float, now: float):
+        """The server's view of what is left wins when it is lower than ours."""
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+
+class KeyState:
+    def __init__(self, key: str, requests_per_minute: int, tokens_per_minute: int):
+        self.key = key
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.sent = 0
+        self.throttled = 0
+
+    @property
+    def label(self) -> str:
+        return f"...{self.key[-4:]}"
+
+    def wait_time(self, estimated_tokens: float, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+        )
+
+
+class KeyScheduler:
+    """
+    Shares a pool of API keys between all LLM calls in the process. Each call goes to
+    the least-loaded key that has request and token budget left; when none has, the
+    call waits (backpressure) instead of failing.
+    """
+
+    def __init__(self, keys, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE):
+        self.keys = [KeyState(key, requests_per_minute, tokens_per_minute) for key in keys]
+        self._condition = threading.Condition()
+        self.waiting = 0
+
+    def acquire(self, estimated_tokens: float, timeout: float = LLM_QUEUE_TIMEOUT_SECONDS) -> KeyState:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    waits = [(state.wait_time(estimated_tokens, now), state) for state in self.keys]
+                    ready = [state for wait, state in waits if wait <= 0]
+                    if ready:
+                        # Least loaded: fewest calls in flight, then the most token budget left
+                        state = min(ready, key=lambda s: (s.in_flight, -s.tokens.tokens))
+                        state.requests.consume(1, now)
+                        state.tokens.consume(estimated_tokens, now)
+                        state.in_flight += 1
+                        state.sent += 1
+                        return state
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("No LLM API key had capacity before the queue timeout")
+                    self._condition.wait(min(min(wait for wait, _ in waits), remaining))
+            finally:
+                self.waiting -= 1
+
+    def release(self, state: KeyState, response: httpx.Response = None):
+        now = time.monotonic()
+        with self._condition:
+            state.in_flight -= 1
+            if response is not None:
+                self._apply_headers(state, response, now)
+            self._condition.notify_all()
+
+    def _apply_headers(self, state: KeyState, response: httpx.Response, now: float):
+        headers = response.headers
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is not None and remaining_requests.isdigit():
+            state.requests.limit(float(remaining_requests), now)
+        if remaining_tokens is not None and remaining_tokens.isdigit():
+            state.tokens.limit(float(remaining_tokens), now)
+
+        if response.status_code == 429:
+            state.throttled += 1
+            cooldown = (
+                parse_duration(headers.get("retry-after"))
+                or max(
+                    parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0,
+                    parse_duration(headers.get("x-ratelimit-reset-requests")) or 0,
+                )
+                or DEFAULT_COOLDOWN_SECONDS
+            )
+            state.blocked_until = max(state.blocked_until, now + cooldown)
+            logger.warning(f"LLM key {state.label} rate limited, resting it for {cooldown:.1f}s")
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "waiting": self.waiting,
+                "keys": [
+                    {"key": s.label, "in_flight": s.in_flight, "sent": s.sent, "throttled": s.throttled}
+                    for s in self.keys
+                ],
+            }
+
+
+def _estimate_tokens(request: httpx.Request) -> float:
+    """Prompt size (~4 bytes per token) plus the completion the request allows."""
+    try:
+        max_tokens = json.loads(request.content).get("max_tokens") or DEFAULT_MAX_TOKENS
+    except (ValueError, AttributeError):
+        max_tokens = DEFAULT_MAX_TOKENS
+    return len(request.content) / 4 + max_tokens
+
+
+class KeyPoolTransport(httpx.BaseTransport):
+    """
+    httpx transport for the OpenAI client: sets the API key chosen by the scheduler
+    on each request, and on a 429 rests that key and sends the call to another one.
+    """
+
+    def __init__(self, scheduler: KeyScheduler, transport: httpx.BaseTransport = None):
+        self.scheduler = scheduler
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        estimated_tokens = _estimate_tokens(request)
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS
+        while True:
+            try:
+                state = self.scheduler.acquire(estimated_tokens, timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                # Give up with the same status the API would have sent
+                return httpx.Response(429, request=request, json={"error": {"message": "All API keys are rate limited"}})
+            request.headers["Authorization"] = f"Bearer {state.key}"
+            try:
+                response = self.transport.handle_request(request)
+            except Exception:
+                self.scheduler.release(state)
+                raise
+            self.scheduler.release(state, response)
+            if response.status_code != 429:
+                return response
+            response.read()
+            response.close()
+
+    def close(self):
+        self.transport.close()
+
+
+class PooledHTTPClient(httpx.Client):
+    # autogen deep-copies llm_config; every copy must keep using the one shared pool
+    def __deepcopy__(self, memo):
+        return self
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Process-wide httpx client that routes LLM calls through the key pool, or None without keys."""
+    global _client
+    with _client_lock:
+        if _client is None and LLM_API_KEYS:
+            scheduler = KeyScheduler(LLM_API_KEYS)
+            _client = PooledHTTPClient(transport=KeyPoolTransport(scheduler), timeout=httpx.Timeout(600, connect=10))
+            logger.info(f"LLM key pool with {len(LLM_API_KEYS)} keys")
+        return _client
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import math
+import logging
+
+import pandas as pd
+
+from app.core import dataset_cache
+from app.core.config import PREVIEW_ROWS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+_SEPARATORS = re.compile(r"[\s,]*")
+_SCALAR_END = re.compile(r"[\s,\]]")
+
+
+def build_preview(session_id: str, dataset_path: str, file_type: str, n_rows: int = PREVIEW_ROWS) -> dict:
+    """
+    Build the agent preview and the UI table for a dataset without loading all of it.
+    Memory use depends on n_rows, not on the size of the file.
+    """
+    head, row_count, column_count = _read_head(session_id, dataset_path, file_type, n_rows)
+    # Only the CSV line count is approximate; it's used when neither memory nor Parquet has the data
+    estimated = isinstance(row_count, _EstimatedCount)
+
+    return {
+        # Minimal preview of the data (first row only) to save tokens
+        "data_preview": head.head(1).to_string(),
+        "table_data": make_json_serializable(head.to_dict(orient="records")),
+        "row_count": int(row_count),
+        "row_count_estimated": estimated,
+        "column_count": column_count,
+    }
+
+
+def _read_head(session_id: str, dataset_path: str, file_type: str, n_rows: int):
+    # Already parsed by an earlier request
+    df = dataset_cache.get_cached(session_id)
+    if df is not None:
+        return df.head(n_rows), len(df), len(df.columns)
+
+    # The Parquet footer holds the counts, and the first batch holds the head
+    parquet_path = dataset_cache.columnar_path(dataset_path)
+    if os.path.exists(parquet_path):
+        return _parquet_head(parquet_path, n_rows)
+
+    if file_type == ".csv":
+        return _csv_head(dataset_path, n_rows)
+    if file_type == ".xlsx":
+        return _xlsx_head(dataset_path, n_rows)
+    if file_type == ".json":
+        return _json_head(session_id, dataset_path, n_rows)
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def _parquet_head(path: str, n_rows: int):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    batch = next(parquet_file.iter_batches(batch_size=n_rows), None)
+    if batch is None:
+        head = parquet_file.schema_arrow.empty_table().to_pandas()
+    else:
+        head = batch.to_pandas()
+    return head, parquet_file.metadata.num_rows, len(parquet_file.schema_arrow.names)
+
+
+class _EstimatedCount(int):
+    """Row count that may be off, reported to users as an estimate."""
+
+
+def _csv_head(path: str, n_rows: int):
+    head = pd.read_csv(path, nrows=n_rows)
+    # Line count minus the header; rows with quoted newlines are counted more than once
+    row_count = _EstimatedCount(max(count_lines(path) - 1, 0))
+    return head, row_count, len(head.columns)
+
+
+def _xlsx_head(path: str, n_rows: int):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(max_row=n_rows + 1, values_only=True)
+        header = next(rows, ())
+        head = pd.DataFrame(list(rows), columns=list(header))
+
+        # The sheet dimensions come from metadata; count rows only when it is missing
+        if sheet.max_row is not None:
+            row_count = max(sheet.max_row - 1, 0)
+        else:
+            row_count = max(sum(1 for _ in sheet.iter_rows(values_only=True)) - 1, 0)
+        column_count = sheet.max_column or len(header)
+    finally:
+        workbook.close()
+    return head, row_count, column_count
+
+
+def _json_head(session_id: str, path: str, n_rows: int):
+    if dataset_cache.is_json_lines(path):
+        records = []
+        row_count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if row_count < n_rows:
+                    records.append(json.loads(line))
+                row_count += 1
+        head = pd.DataFrame(records)
+        return head, row_count, len(head.columns)
+
+    if _first_char(path) == "[":
+        records = []
+        row_count = 0
+        for record in iter_json_array(path):
+            if row_count < n_rows:
+                records.append(record)
+            row_count += 1
+        head = pd.DataFrame(records)
+        return head, row_count, len(head.columns)
+
+    # Column-oriented documents can't be streamed record by record
+    logger.info(f"JSON layout of {path} can't be streamed, loading full dataset")
+    df = dataset_cache.load_dataset(session_id, path, ".json")
+    return df.head(n_rows), len(df), len(df.columns)
+
+
+def _first_char(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return ""
+            stripped = chunk.lstrip()
+            if stripped:
+                return stripped[0]
+
+
+def iter_json_array(path: str):
+    """Yield the elements of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(CHUNK_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        pos = 1
+        eof = False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                if eof:
+                    return
+                more = f.read(CHUNK_SIZE)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            if buffer[pos] == "]":
+                return
+            # Numbers and literals have no closing character: "12" may continue as "12.5" in the next
+            # chunk, so only parse them once the delimiter after them is in the buffer
+            scalar = buffer[pos] not in '{["'
+            if scalar and not eof and not _SCALAR_END.search(buffer, pos):
+                more = f.read(CHUNK_SIZE)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element spans the chunk boundary
+                if eof:
+                    raise
+                more = f.read(CHUNK_SIZE)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield value
+            pos = end
+            if pos >= CHUNK_SIZE:
+                buffer, pos = buffer[pos:], 0
+
+
+def count_lines(path: str) -> int:
+    """Count lines by scanning the file in fixed-size binary chunks."""
+    count = 0
+    last_byte = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            last_byte = chunk[-1:]
+    # Last line without a trailing newline
+    if last_byte != b"\n":
+        count += 1
+    return count
+
+
+def make_json_serializable(obj):
+    """Convert NaN/Infinity values, which can't be JSON serialized, to None."""
+    if isinstance(obj, float):
+        if math.isnan(obj) or math.isinf(obj):
+            return None
+    elif isinstance(obj, dict):
+        return {k: make_json_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [make_json_serializable(item) for item in obj]
+    return obj
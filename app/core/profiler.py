@@ -0,0 +1,230 @@
+import os
+import json
+import math
+import logging
+
+import numpy as np
+import pandas as pd
+
+from app.core import dataset_cache
+from app.core.config import PROFILE_CHUNK_ROWS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Profile stored in a subdirectory of data/uploads/<session_id>; uploads are single .csv/.xlsx/.json
+# files, so neither name can collide with a user's file
+PROFILE_DIRNAME = "_profile"
+PROFILE_FILENAME = "profile.json"
+
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+QUANTILE_SAMPLE_SIZE = 10000
+TOP_K = 10
+TOP_K_CANDIDATES = 1000  # Counts kept between chunks when merging top values
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+def profile_path(dataset_path: str) -> str:
+    return os.path.join(os.path.dirname(dataset_path), PROFILE_DIRNAME, PROFILE_FILENAME)
+
+
+class _HyperLogLog:
+    """Distinct-count sketch updated with whole arrays of 64-bit hashes at once."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray):
+        if hashes.size == 0:
+            return
+        value_bits = 64 - self.precision
+        index = (hashes >> np.uint64(value_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << value_bits) - 1)
+        # Rank = position of the leftmost 1 bit in the remaining bits
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (value_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> int:
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Small-range correction
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class _ColumnProfile:
+    def __init__(self, name):
+        self.name = name
+        self.dtypes = set()
+        self.count = 0
+        self.nulls = 0
+        self.hll = _HyperLogLog()
+        self.top = pd.Series(dtype="float64")
+        # Numeric stats
+        self.numeric = True
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.sample_keys = np.empty(0)
+        self.sample_values = np.empty(0)
+
+    def update(self, series: pd.Series, rng: np.random.Generator):
+        self.dtypes.add(str(series.dtype))
+        values = series.dropna()
+        self.count += len(values)
+        self.nulls += len(series) - len(values)
+        if values.empty:
+            return
+
+        self.hll.update(pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64))
+
+        counts = values.value_counts()
+        self.top = self.top.add(counts, fill_value=0).nlargest(TOP_K_CANDIDATES)
+
+        if not (pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)):
+            self.numeric = False
+            return
+        numbers = values.to_numpy(dtype=np.float64)
+        chunk_min, chunk_max = values.min(), values.max()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+        self.total += numbers.sum()
+        self.total_sq += np.square(numbers).sum()
+
+        # Bottom-k sampling: keep the values with the smallest random keys, a uniform sample of everything seen
+        keys = np.concatenate([self.sample_keys, rng.random(numbers.size)])
+        pool = np.concatenate([self.sample_values, numbers])
+        if keys.size > QUANTILE_SAMPLE_SIZE:
+            keep = np.argpartition(keys, QUANTILE_SAMPLE_SIZE)[:QUANTILE_SAMPLE_SIZE]
+            keys, pool = keys[keep], pool[keep]
+        self.sample_keys, self.sample_values = keys, pool
+
+    def _dtype(self) -> str:
+        if len(self.dtypes) == 1:
+            return next(iter(self.dtypes))
+        # Chunks can disagree, e.g. int64 until a chunk with missing values turns up as float64
+        if all(dtype.startswith(("int", "float", "uint")) for dtype in self.dtypes):
+            return "float64"
+        return "object"
+
+    def result(self) -> dict:
+        column = {
+            "name": str(self.name),
+            "dtype": self._dtype(),
+            "count": self.count,
+            "null_count": self.nulls,
+            "distinct_estimate": min(self.hll.estimate(), self.count),
+            "top_values": [
+                {"value": _json_value(value), "count": int(count)}
+                for value, count in self.top.nlargest(TOP_K).items()
+            ],
+        }
+        if self.numeric and self.count:
+            mean = self.total / self.count
+            variance = max(self.total_sq / self.count - mean * mean, 0.0)
+            column.update({
+                "min": _json_value(self.min),
+                "max": _json_value(self.max),
+                "mean": _json_value(mean),
+                "std": _json_value(math.sqrt(variance)),
+                "quantiles": {
+                    str(q): _json_value(v)
+                    for q, v in zip(QUANTILES, np.quantile(self.sample_values, QUANTILES))
+                },
+            })
+        return column
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _iter_chunks(dataset_path: str, file_type: str):
+    """Yield the dataset as DataFrames of at most PROFILE_CHUNK_ROWS rows."""
+    parquet_path = dataset_cache.columnar_path(dataset_path)
+    if os.path.exists(parquet_path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=PROFILE_CHUNK_ROWS):
+            yield batch.to_pandas()
+    else:
+        yield from dataset_cache.iter_source_chunks(dataset_path, file_type, PROFILE_CHUNK_ROWS)
+
+
+def build_profile(dataset_path: str, file_type: str) -> dict:
+    """Profile every column of a dataset in one chunked pass."""
+    rng = np.random.default_rng(42)
+    columns = {}
+    row_count = 0
+    for chunk in _iter_chunks(dataset_path, file_type):
+        row_count += len(chunk)
+        for name in chunk.columns:
+            if name not in columns:
+                columns[name] = _ColumnProfile(name)
+            columns[name].update(chunk[name], rng)
+
+    return {
+        "dataset": os.path.basename(dataset_path),
+        "row_count": row_count,
+        "column_count": len(columns),
+        "columns": [column.result() for column in columns.values()],
+    }
+
+
+def write_profile(dataset_path: str, file_type: str):
+    """Build and persist the profile. Returns it, or None if profiling failed."""
+    try:
+        profile = build_profile(dataset_path, file_type)
+    except Exception as e:
+        logger.warning(f"Failed to profile {dataset_path}: {e}")
+        return None
+
+    target = profile_path(dataset_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, target)
+    logger.info(f"Wrote dataset profile to {target}")
+    return profile
+
+
+def load_profile(dataset_path: str):
+    """Stored profile for a dataset, or None if it hasn't been built yet."""
+    path = profile_path(dataset_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def summarize_profile(profile: dict) -> str:
+    """Compact text form of a profile for the agent prompt."""
+    lines = [f"Rows: {profile['row_count']}, Columns: {profile['column_count']}"]
+    for column in profile["columns"]:
+        parts = [
+            f"{column['name']} ({column['dtype']})",
+            f"nulls={column['null_count']}",
+            f"distinct~{column['distinct_estimate']}",
+        ]
+        if "mean" in column:
+            mean = f"{column['mean']:.4g}" if column["mean"] is not None else "n/a"
+            parts.append(f"min={column['min']} max={column['max']} mean={mean}")
+        elif column["top_values"]:
+            top = ", ".join(str(item["value"]) for item in column["top_values"][:3])
+            parts.append(f"top: {top}")
+        lines.append(" | ".join(parts))
+    return "\n".join(lines)
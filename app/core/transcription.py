@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import random
+
+import httpx
+
+from app.core.config import (
+    GROQ_TRANSCRIPTION_URL,
+    TRANSCRIPTION_MODEL,
+    TRANSCRIPTION_TIMEOUT_SECONDS,
+    TRANSCRIPTION_MAX_RETRIES,
+    TRANSCRIPTION_MAX_CONCURRENCY,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rate limiting and transient upstream failures are worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+_client = None
+_semaphore = None
+
+
+class TranscriptionError(Exception):
+    """Raised when the transcription service can't produce a transcript."""
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared client, so keep-alive connections are reused across requests."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(TRANSCRIPTION_TIMEOUT_SECONDS, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=TRANSCRIPTION_MAX_CONCURRENCY,
+                max_keepalive_connections=TRANSCRIPTION_MAX_CONCURRENCY,
+            ),
+        )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(TRANSCRIPTION_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _retry_delay(attempt: int, response: httpx.Response = None) -> float:
+    # Honour Retry-After when the server sends one, otherwise exponential backoff with jitter
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** attempt), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def transcribe(audio_file, filename: str, content_type: str, api_key: str, model: str = TRANSCRIPTION_MODEL) -> str:
+    """
+    Send an audio file object to the transcription API and return the text.
+    The file is rewound before every attempt, so it must be seekable.
+    """
+    headers = {"Authorization": f"Bearer {api_key}"}
+
+    # Cap in-flight upstream requests; extra callers wait here without blocking the event loop
+    async with _get_semaphore():
+        for attempt in range(TRANSCRIPTION_MAX_RETRIES + 1):
+            audio_file.seek(0)
+            files = {"file": (filename, audio_file, content_type)}
+            try:
+                response = await get_client().post(
+                    GROQ_TRANSCRIPTION_URL, files=files, data={"model": model}, headers=headers
+                )
+            except httpx.TransportError as e:
+                if attempt == TRANSCRIPTION_MAX_RETRIES:
+                    raise TranscriptionError(f"Transcription request failed: {e}") from e
+                delay = _retry_delay(attempt)
+                logger.warning(f"Transcription request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < TRANSCRIPTION_MAX_RETRIES:
+                delay = _retry_delay(attempt, response)
+                logger.warning(f"Transcription API returned {response.status_code}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.is_error:
+                raise TranscriptionError(
+                    f"Transcription API returned {response.status_code}: {response.text}"
+                )
+            return response.json().get("text", "")
@@ -0,0 +1,40 @@
+import os
+import hashlib
+
+from app.core.cache_store import SqliteCache
+from app.core.config import (
+    CACHE_DIR,
+    TRANSCRIPTION_CACHE_TTL_SECONDS,
+    TRANSCRIPTION_CACHE_MAX_BYTES,
+)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+store = SqliteCache(
+    os.path.join(CACHE_DIR, "transcriptions.sqlite"),
+    ttl_seconds=TRANSCRIPTION_CACHE_TTL_SECONDS,
+    max_bytes=TRANSCRIPTION_CACHE_MAX_BYTES,
+)
+
+
+def audio_key(audio_file, model: str) -> str:
+    """Content hash of the audio bytes plus the model name, leaving the file rewound."""
+    digest = hashlib.sha256(model.encode("utf-8") + b"\0")
+    audio_file.seek(0)
+    while True:
+        chunk = audio_file.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    audio_file.seek(0)
+    return digest.hexdigest()
+
+
+def get(key: str):
+    """Cached transcript for key, or None."""
+    value = store.get(key)
+    return value.decode("utf-8") if value is not None else None
+
+
+def put(key: str, text: str):
+    store.set(key, text.encode("utf-8"))
@@ -0,0 +1,27 @@
+import os
+import shutil
+import logging
+import tempfile
+from contextlib import contextmanager
+
+from app.core.config import CODING_DIR
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def run_workspace(session_id: str):
+    """
+    Private scratch directory for one analysis run, removed when the run ends.
+    Concurrent runs never share generated scripts or intermediate files.
+    """
+    os.makedirs(CODING_DIR, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f"{session_id}_", dir=CODING_DIR)
+    logger.info(f"Created workspace {work_dir}")
+    try:
+        yield work_dir
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.info(f"Removed workspace {work_dir}")
@@ -0,0 +1,71 @@
+import logging
+
+from sqlalchemy import create_engine, event
+
+from app.core.config import (
+    DATABASE_PROFILE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE_KB,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _sqlite_engine(url: str):
+    """
+    SQLite tuned for status polling alongside background writers: WAL lets readers
+    run during a write, and busy_timeout makes writers wait instead of failing
+    with "database is locked".
+    """
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, fsync only at checkpoints
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")  # Negative value is in KiB
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def _postgres_engine(url: str):
+    """Pooled engine: connections are checked before use and replaced before server-side timeouts."""
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        pool_use_lifo=True,  # Idle connections above the working set age out
+    )
+
+
+_PROFILES = {
+    "sqlite": _sqlite_engine,
+    "postgresql": _postgres_engine,
+    "default": lambda url: create_engine(url, pool_pre_ping=True),
+}
+
+
+def build_engine(url: str, profile: str = DATABASE_PROFILE):
+    """Create the engine for DATABASE_URL with the settings of its profile."""
+    engine = _PROFILES[profile](url)
+    logger.info(f"Database engine configured with the '{profile}' profile")
+    return engine
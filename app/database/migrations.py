@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, select
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata so create_all never touches it
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime(timezone=True)),
+)
+
+
+def _baseline(connection):
+    # Tables that don't exist yet; existing databases keep their tables as they are
+    models.Base.metadata.create_all(bind=connection)
+
+
+def _create_indexes(*names):
+    def migrate(connection):
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in names:
+                    index.create(bind=connection, checkfirst=True)
+    return migrate
+
+
+# (version, description, migration). Append new migrations; never edit applied ones.
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "session lookup indexes on files and logs", _create_indexes(
+        "ix_files_session_id",
+        "ix_files_file_type",
+        "ix_logs_session_id",
+        "ix_logs_session_id_timestamp",
+    )),
+]
+
+
+def current_version(connection) -> int:
+    versions = connection.execute(select(schema_version.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def run_migrations(engine):
+    """Apply pending migrations in order, each in its own transaction. Returns the schema version."""
+    _version_metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        try:
+            with engine.begin() as connection:
+                migrate(connection)
+                connection.execute(schema_version.insert().values(
+                    version=number, description=description, applied_at=datetime.now(timezone.utc)
+                ))
+        except IntegrityError:
+            # Another process (API or standalone worker) applied it first
+            logger.info(f"Migration {number} already applied elsewhere")
+        else:
+            logger.info(f"Applied migration {number}: {description}")
+        version = number
+    return version
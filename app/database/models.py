@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -19,8 +19,8 @@ class File(Base):
     __tablename__ = "files"
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, ForeignKey("sessions.session_id", name="fk_file_session_id"))
-    file_type = Column(String)
+    session_id = Column(String, ForeignKey("sessions.session_id", name="fk_file_session_id"), index=True)
+    file_type = Column(String, index=True)
     file_path = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -28,11 +28,34 @@ class File(Base):
 
 class Log(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        # Session logs in time order without a sort
+        Index("ix_logs_session_id_timestamp", "session_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, ForeignKey("sessions.session_id", name="fk_log_session_id"))
+    session_id = Column(String, ForeignKey("sessions.session_id", name="fk_log_session_id"), index=True)
     command = Column(String)
     output_summary = Column(String)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     session = relationship("Session", back_populates="logs")
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, ForeignKey("sessions.session_id", name="fk_job_session_id"), index=True)
+    prompt = Column(String)
+    dataset_path = Column(String)
+    data_preview = Column(String)
+    priority = Column(Integer, default=0)
+    status = Column(String, default="queued", index=True)  # "queued", "running", "completed", "failed", "cancelled"
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String)
+    error = Column(String)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
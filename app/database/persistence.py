@@ -0,0 +1,95 @@
+import json
+import math
+import time
+import logging
+
+from sqlalchemy import insert
+
+from . import database, models
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _sanitize(obj):
+    """Replace NaN/Infinity, which can't be stored as JSON, with None."""
+    if isinstance(obj, float):
+        if math.isnan(obj) or math.isinf(obj):
+            return None
+    elif isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_sanitize(item) for item in obj]
+    return obj
+
+
+def sanitize_content(content) -> str:
+    """Message content as a string, with NaN/Infinity removed from JSON payloads."""
+    if not isinstance(content, str):
+        content = str(content)
+    # Only JSON that actually contains NaN/Infinity needs the parse and re-dump
+    if ("NaN" in content or "Infinity" in content) and content.lstrip()[:1] in ("{", "["):
+        try:
+            content = json.dumps(_sanitize(json.loads(content)))
+        except ValueError:
+            pass  # If parsing fails, keep original content
+    return content
+
+
+class RunRecorder:
+    """
+    Collects the Log and File rows produced by one analysis run and writes them,
+    together with the final session status, in a single transaction. File rows that
+    are announced during the run are written ahead of that with flush_files().
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.logs = []
+        self.files = []
+
+    def add_log(self, command: str, output_summary: str):
+        self.logs.append({"session_id": self.session_id, "command": command, "output_summary": output_summary})
+
+    def add_file(self, file_type: str, file_path: str):
+        self.files.append({"session_id": self.session_id, "file_type": file_type, "file_path": file_path})
+
+    def add_chat_history(self, chat_history):
+        for message in chat_history:
+            self.add_log(
+                message.get("name", message.get("role", "unknown_agent")),
+                sanitize_content(message.get("content", "")),
+            )
+
+    def flush_files(self):
+        """
+        Write the files collected so far in one commit, so they can be served (and announced
+        to listeners) while the run goes on. Everything else is still written by flush().
+        """
+        if not self.files:
+            return
+        with database.session_scope() as db:
+            db.execute(insert(models.File), self.files)
+        logger.info(f"Persisted {len(self.files)} files for session {self.session_id}")
+        self.files = []
+
+    def flush(self, status: str = None):
+        """Bulk insert everything collected so far and update the session status in one commit."""
+        started = time.perf_counter()
+        with database.session_scope() as db:
+            if self.logs:
+                db.execute(insert(models.Log), self.logs)
+            if self.files:
+                db.execute(insert(models.File), self.files)
+            if status:
+                db.query(models.Session).filter(models.Session.session_id == self.session_id).update(
+                    {models.Session.status: status}, synchronize_session=False
+                )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Persisted {len(self.logs)} logs and {len(self.files)} files for session "
+            f"{self.session_id} in 1 commit ({elapsed_ms:.1f} ms)"
+        )
+        self.logs = []
+        self.files = []
@@ -1,10 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import upload, voice, analyze, results, delete, download, status
-from app.database import database, models
+from app.api import upload, voice, analyze, results, delete, download, status, profile, logs, progress
+from app.database import database, migrations
+from app.core import transcription, job_queue
+from app.core.config import JOB_WORKERS_EMBEDDED
 
-# Create database tables
-models.Base.metadata.create_all(bind=database.engine)
+# Create or upgrade database tables
+migrations.run_migrations(database.engine)
 
 app = FastAPI(
     title="Voice-Based Exploratory Data Analysis System",
@@ -33,6 +35,22 @@ app.include_router(results.router, tags=["Results"])
 app.include_router(delete.router, tags=["Delete"])
 app.include_router(download.router, tags=["Download"])
 app.include_router(status.router, tags=["Status"])
+app.include_router(profile.router, tags=["Profile"])
+app.include_router(logs.router, tags=["Logs"])
+app.include_router(progress.router, tags=["Progress"])
+
+@app.on_event("startup")
+def start_analysis_workers():
+    if JOB_WORKERS_EMBEDDED:
+        job_queue.start_worker_pool()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await transcription.close_client()
+
+@app.on_event("shutdown")
+def stop_analysis_workers():
+    job_queue.stop_worker_pool()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Keep the app's database and API keys away from real settings while importing app modules
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("JOB_WORKERS_EMBEDDED", "false")
+for name in ("GROQ_API_KEY", "GROQ_API_KEY1", "GROQ_API_KEY2", "GROQ_API_KEY3", "GROQ_API_KEY4"):
+    os.environ.setdefault(name, "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
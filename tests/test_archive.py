@@ -0,0 +1,149 @@
+import io
+import zipfile
+
+import pytest
+
+from app.core import archive
+
+
+def test_session_files_skip_partial_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "RESULTS_DIRECTORY", str(tmp_path / "results"))
+    monkeypatch.setattr(archive, "UPLOADS_DIRECTORY", str(tmp_path / "uploads"))
+    results = tmp_path / "results" / "s1"
+    results.mkdir(parents=True)
+    (results / "chart.png").write_bytes(b"png")
+    (results / ".archive-abc.tmp").write_bytes(b"partial")
+    (results / "graph_data.json.tmp").write_bytes(b"{}")
+
+    assert [name for name, _ in archive.session_files("s1")] == ["chart.png"]
+
+
+def test_concurrent_downloads_see_the_same_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "RESULTS_DIRECTORY", str(tmp_path / "results"))
+    monkeypatch.setattr(archive, "UPLOADS_DIRECTORY", str(tmp_path / "uploads"))
+    results = tmp_path / "results" / "s1"
+    results.mkdir(parents=True)
+    (results / "report.csv").write_text("a,b\n1,2\n")
+    files = archive.session_files("s1")
+    target = archive.cached_archive_path("s1", archive.manifest_hash(files))
+
+    # Start caching one archive, then list the files as a second download would
+    first = archive.stream_and_cache_zip(files, target)
+    next(first)
+    assert archive.session_files("s1") == files
+    assert archive.manifest_hash(archive.session_files("s1")) == archive.manifest_hash(files)
+    for _ in first:
+        pass
+    with zipfile.ZipFile(target) as cached:
+        assert cached.namelist() == ["report.csv"]
+
+
+def test_session_files_keep_dot_named_uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "RESULTS_DIRECTORY", str(tmp_path / "results"))
+    monkeypatch.setattr(archive, "UPLOADS_DIRECTORY", str(tmp_path / "uploads"))
+    uploads = tmp_path / "uploads" / "s1"
+    uploads.mkdir(parents=True)
+    (uploads / ".sales.csv").write_text("a\n1\n")
+
+    assert [name for name, _ in archive.session_files("s1")] == [".sales.csv"]
+
+
+def test_stream_zip_starts_before_the_archive_is_built(tmp_path, monkeypatch):
+    import inspect
+    import os
+    import tempfile
+
+    big = tmp_path / "big.csv"
+    big.write_bytes(os.urandom(1024) * 20_000)  # ~20 MB, compressible
+    chart = tmp_path / "chart.png"
+    chart.write_bytes(os.urandom(256 * 1024))
+    # Anything spilled to a temp file would land here, not in the shared system temp dir
+    spill = tmp_path / "tmp"
+    spill.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spill))
+
+    stream = archive.stream_zip([("chart.png", str(chart)), ("big.csv", str(big))])
+    first = next(stream)
+
+    # The first bytes are a local file header, sent while the rest of the archive is still to be built
+    assert first.startswith(b"PK\x03\x04")
+    assert inspect.getgeneratorstate(stream) == inspect.GEN_SUSPENDED
+    assert len(first) <= 2 * archive.CHUNK_SIZE
+
+    data = first + b"".join(stream)
+    with zipfile.ZipFile(io.BytesIO(data)) as built:
+        assert built.getinfo("chart.png").compress_type == zipfile.ZIP_STORED
+        assert built.getinfo("big.csv").compress_type == zipfile.ZIP_DEFLATED
+        assert built.read("big.csv") == big.read_bytes()
+    assert list(spill.iterdir()) == []
+
+
+@pytest.fixture
+def download(tmp_path, monkeypatch):
+    """Download API for a completed session "d1" with one result file."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import download
+    from app.database import database, migrations, models
+
+    monkeypatch.setattr(archive, "RESULTS_DIRECTORY", str(tmp_path / "results"))
+    monkeypatch.setattr(archive, "UPLOADS_DIRECTORY", str(tmp_path / "uploads"))
+    results = tmp_path / "results" / "d1"
+    results.mkdir(parents=True)
+    (results / "report.csv").write_text("a,b\n1,2\n")
+    migrations.run_migrations(database.engine)
+    with database.session_scope() as db:
+        db.query(models.Session).filter_by(session_id="d1").delete()
+        db.add(models.Session(session_id="d1", status="completed"))
+
+    app = FastAPI()
+    app.include_router(download.router)
+    return TestClient(app), results
+
+
+def _cached_archives(results):
+    return sorted(path.name for path in results.iterdir() if path.name.startswith(archive.ARCHIVE_PREFIX))
+
+
+def _archive_name(response):
+    digest = response.headers["etag"].strip('"')
+    return f"{archive.ARCHIVE_PREFIX}{digest}.zip"
+
+
+def test_matching_etag_gets_a_304(download):
+    client, _ = download
+    etag = client.get("/download/d1").headers["etag"]
+
+    response = client.get("/download/d1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_repeat_download_is_served_from_the_cached_archive(download, monkeypatch):
+    client, results = download
+    first = client.get("/download/d1")
+    assert _cached_archives(results) == [_archive_name(first)]
+
+    monkeypatch.setattr(archive, "stream_and_cache_zip", lambda *args: pytest.fail("archive built again"))
+    second = client.get("/download/d1")
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["accept-ranges"] == "bytes"  # The cached file, not a stream
+
+
+def test_changed_result_file_invalidates_the_cached_archive(download):
+    client, results = download
+    first = client.get("/download/d1")
+
+    # A later run rewrites the file: new manifest, new ETag, and the old one no longer matches
+    (results / "report.csv").write_text("a,b\n1,2\n3,4\n")
+    response = client.get("/download/d1", headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert response.headers["etag"] != first.headers["etag"]
+    with zipfile.ZipFile(io.BytesIO(response.content)) as built:
+        assert built.read("report.csv") == b"a,b\n1,2\n3,4\n"
+    # Only the archive of the current manifest is kept
+    assert _cached_archives(results) == [_archive_name(response)]
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from app.core import cancellation
+from app.core.cancellation import AnalysisCancelled, RunBudget
+
+
+def test_cancel_run_only_stops_that_job():
+    first = cancellation.start_run("s1", run_id=1)
+    second = cancellation.start_run("s1", run_id=2)
+    try:
+        assert cancellation.cancel_run(1)
+        with pytest.raises(AnalysisCancelled):
+            first.check()
+        second.check()
+    finally:
+        cancellation.finish_run(first)
+        cancellation.finish_run(second)
+    assert not cancellation.cancel_run(2)
+
+
+def test_cancel_runs_callbacks_once():
+    budget = RunBudget("s1", time_budget=0)
+    calls = []
+    budget.on_cancel(lambda: calls.append(1))
+    budget.cancel()
+    budget.cancel()
+    budget.on_cancel(lambda: calls.append(2))  # Registered late: runs immediately
+    assert calls == [1, 2]
+
+
+def test_time_budget_cancels():
+    budget = RunBudget("s1", time_budget=0.05)
+    time.sleep(0.2)
+    with pytest.raises(AnalysisCancelled, match="Time budget"):
+        budget.check()
+    budget.close()
+
+
+def test_token_budget_cancels(monkeypatch):
+    budget = RunBudget("s1", time_budget=0, token_budget=100)
+    monkeypatch.setattr(budget, "tokens_used", lambda: 50)
+    budget.check()
+    monkeypatch.setattr(budget, "tokens_used", lambda: 150)
+    with pytest.raises(AnalysisCancelled, match="Token budget"):
+        budget.check()
@@ -0,0 +1,55 @@
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from app.core import chart_previews
+from app.database import database, migrations, models
+from app.database.persistence import RunRecorder
+
+
+@pytest.fixture(autouse=True)
+def registered():
+    migrations.run_migrations(database.engine)
+    with database.session_scope() as db:
+        db.query(models.File).filter_by(session_id="p1").delete()
+
+    def count():
+        with database.session_scope() as db:
+            return db.query(models.File).filter_by(session_id="p1").count()
+    return count
+
+
+def _chart(path, color):
+    Image.new("RGB", (1200, 800), color).save(path)
+    return {"filename": os.path.basename(path), "type": "visualization", "path": str(path)}
+
+
+def test_only_new_or_changed_charts_get_previews(tmp_path, registered):
+    chart = _chart(tmp_path / "age_histogram.png", "red")
+    recorder = RunRecorder("p1")
+
+    first = chart_previews.generate_chart_previews([chart], recorder)
+    assert sorted(f["type"] for f in first) == ["visualization_thumbnail", "visualization_web"]
+    assert registered() == 2
+
+    # A later run finds the same chart in the results dir: nothing to render or register again
+    assert chart_previews.generate_chart_previews([chart], recorder) == []
+    assert registered() == 2
+
+    # A run that rewrites the chart gets fresh previews
+    _chart(tmp_path / "age_histogram.png", "blue")
+    later = time.time_ns() + 1_000_000_000
+    os.utime(chart["path"], ns=(later, later))
+    assert len(chart_previews.generate_chart_previews([chart], recorder)) == 2
+    assert registered() == 4
+
+
+def test_files_in_the_previews_directory_are_skipped(tmp_path, registered):
+    (tmp_path / chart_previews.PREVIEW_DIRNAME).mkdir()
+    preview = _chart(tmp_path / chart_previews.PREVIEW_DIRNAME / "age_histogram.web.png", "red")
+    recorder = RunRecorder("p1")
+
+    assert chart_previews.generate_chart_previews([preview], recorder) == []
+    assert registered() == 0
@@ -0,0 +1,31 @@
+import os
+import time
+import threading
+
+import pandas as pd
+
+from app.core import chart_renderer
+
+
+def test_in_process_rendering_does_not_watch_the_parent(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_renderer, "_namespace", {})
+    png_path = tmp_path / "age_histogram.png"
+
+    chart_renderer.draw_chart(pd.DataFrame({"age": [25, 32, 47]}), 'ax.hist(df["age"])', str(png_path))
+
+    assert png_path.stat().st_size > 0
+    assert "render-parent-watch" not in [thread.name for thread in threading.enumerate()]
+
+
+def test_result_files_are_read_directly_and_rereads_follow_rewrites(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_renderer, "_frames", {})
+    cleaned = tmp_path / "cleaned_data.csv"
+    pd.DataFrame({"age": [25, 32]}).to_csv(cleaned, index=False)
+
+    assert list(chart_renderer._load_frame(str(cleaned))["age"]) == [25, 32]
+    assert sorted(os.listdir(tmp_path)) == ["cleaned_data.csv"]  # No Parquet copy among the results
+
+    # A later run rewrites the cleaned data; the next chart must see the new rows
+    pd.DataFrame({"age": [40, 41, 42]}).to_csv(cleaned, index=False)
+    os.utime(cleaned, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert list(chart_renderer._load_frame(str(cleaned))["age"]) == [40, 41, 42]
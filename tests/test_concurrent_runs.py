@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.agents import agent_setup
+from app.core import agent_service
+from app.core.llm_scheduler import KeyPoolTransport, KeyScheduler, PooledHTTPClient
+from app.database.persistence import RunRecorder
+
+REQUESTS_PER_MINUTE = 600  # 10 calls per second per key
+RUNS = 8  # "inspect the data" runs the inspector and the reporter: 2 LLM calls each
+
+
+def _mock_llm():
+    """Stand-in OpenAI-compatible endpoint recording which key sent each call, and when."""
+    calls = []
+    lock = threading.Lock()
+
+    def handler(request):
+        with lock:
+            calls.append((request.headers["Authorization"].removeprefix("Bearer "), time.monotonic()))
+        time.sleep(0.01)
+        return httpx.Response(200, json={
+            "id": "c1", "object": "chat.completion", "created": 0, "model": "test-model",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "Step complete"}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 2, "total_tokens": 102},
+        })
+    return httpx.MockTransport(handler), calls
+
+
+@pytest.fixture
+def run_analyses(monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_setup, "KERNEL_ENABLED", False)
+    monkeypatch.setattr(agent_service, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent_service, "ORCHESTRATION_MODE", "state_machine")
+    monkeypatch.setattr(agent_service, "generate_chart_previews", lambda files, recorder: None)
+
+    def run(keys):
+        """Run RUNS analyses at once, every agent calling the mock LLM through one key pool."""
+        scheduler = KeyScheduler(keys, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=10_000_000)
+        for state in scheduler.keys:
+            state.requests.tokens = 0  # Start empty so every call is paced by the refill rate
+        transport, calls = _mock_llm()
+        client = PooledHTTPClient(transport=KeyPoolTransport(scheduler, transport))
+        llm_config = {"config_list": [{
+            "model": "test-model", "api_key": "unused", "base_url": "http://llm.test/v1", "http_client": client,
+        }], "cache_seed": None}
+        for name in ("llm_config_inspector", "llm_config_visualizer", "llm_config_reporter"):
+            monkeypatch.setattr(agent_setup, name, llm_config)
+        monkeypatch.setattr(agent_service, "llm_config_coordinator", llm_config)
+
+        def analysis(index):
+            session_dir = tmp_path / f"{len(keys)}-{index}"
+            (session_dir / "results").mkdir(parents=True)
+            result = agent_service._run_group_chat(
+                f"run-{index}", "inspect the data", str(session_dir / "data.csv"), f"Task {index}",
+                str(session_dir / "results"), str(session_dir), RunRecorder(f"run-{index}"),
+            )
+            return result["chat_history"]
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=RUNS) as pool:
+            histories = list(pool.map(analysis, range(RUNS)))
+        return histories, calls, started, time.monotonic() - started
+    return run
+
+
+def test_concurrent_runs_keep_their_own_conversations(run_analyses):
+    histories, calls, _, _ = run_analyses(["key-0001", "key-0002"])
+
+    assert len(calls) == RUNS * 2
+    for index, history in enumerate(histories):
+        assert [message.get("name") for message in history] == ["CoordinatorAgent", "DataInspectorAgent", "ReportAgent"]
+        assert history[0]["content"] == f"Task {index}"
+
+
+def test_each_key_stays_within_its_request_rate(run_analyses):
+    keys = ["key-0001", "key-0002", "key-0003"]
+    _, calls, started, _ = run_analyses(keys)
+
+    rate = REQUESTS_PER_MINUTE / 60
+    for key in keys:
+        sent = sorted(at for used, at in calls if used == key)
+        assert sent, key
+        # The bucket started empty, so the n-th call on a key can't go out before n / rate seconds
+        for count, at in enumerate(sent, start=1):
+            assert at - started >= count / rate - 0.01, (key, count, at - started)
+
+
+def test_throughput_scales_with_the_key_pool(run_analyses):
+    _, single_calls, _, single_elapsed = run_analyses(["key-0001"])
+    _, pooled_calls, _, pooled_elapsed = run_analyses(["key-0001", "key-0002", "key-0003", "key-0004"])
+
+    assert len(single_calls) == len(pooled_calls) == RUNS * 2
+    assert len({key for key, _ in pooled_calls}) == 4
+    # Four keys refill four times as fast; leave room for agent setup overhead
+    assert pooled_elapsed * 2.5 < single_elapsed, (single_elapsed, pooled_elapsed)
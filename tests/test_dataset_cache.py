@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.core import dataset_cache
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "uploads" / "d1" / "sales.csv"
+    path.parent.mkdir(parents=True)
+    pd.DataFrame({"region": ["N", "S", "E"], "amount": [10, 20, 30]}).to_csv(path, index=False)
+    dataset_cache.invalidate("d1")
+    yield str(path)
+    dataset_cache.invalidate("d1")
+
+
+def test_first_parse_writes_the_shared_columnar_copy(upload, monkeypatch):
+    df = dataset_cache.read_dataset(upload, ".csv")
+    assert os.path.exists(dataset_cache.columnar_path(upload))
+
+    # Any later reader, in any process, gets the Parquet copy instead of parsing the CSV again
+    def no_parse(*args):
+        raise AssertionError("source file parsed again")
+
+    monkeypatch.setattr(dataset_cache, "read_source", no_parse)
+    pd.testing.assert_frame_equal(dataset_cache.read_dataset(upload, ".csv"), df)
+    assert not [name for name in os.listdir(os.path.dirname(upload)) if name.endswith(".tmp")]
+
+
+def test_load_dataset_hits_memory_then_parquet(upload, monkeypatch):
+    first = dataset_cache.load_dataset("d1", upload, ".csv")
+    assert dataset_cache.load_dataset("d1", upload, ".csv") is first
+
+    dataset_cache.invalidate("d1")
+    monkeypatch.setattr(dataset_cache, "read_source", lambda *args: pytest.fail("source file parsed again"))
+    pd.testing.assert_frame_equal(dataset_cache.load_dataset("d1", upload, ".csv"), first)
+
+
+def test_conversion_streams_the_source_in_chunks(tmp_path, monkeypatch):
+    path = tmp_path / "big.csv"
+    # The first missing value only shows up in a later chunk, widening the column to float
+    pd.DataFrame({"n": list(range(25)) + [None] * 5, "label": ["x"] * 30}).to_csv(path, index=False)
+    monkeypatch.setattr(dataset_cache, "COLUMNAR_CHUNK_ROWS", 10)
+    monkeypatch.setattr(dataset_cache, "read_source", lambda *args: pytest.fail("source parsed in one piece"))
+
+    target = dataset_cache.convert_to_columnar(str(path), ".csv")
+
+    import pyarrow.parquet as pq
+
+    assert target == dataset_cache.columnar_path(str(path))
+    assert pq.ParquetFile(target).metadata.num_row_groups == 3
+    pd.testing.assert_frame_equal(pd.read_parquet(target), pd.read_csv(path))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_failed_conversion_is_not_retried(upload, monkeypatch):
+    def unconvertible(*args):
+        raise ValueError("mixed types")
+
+    monkeypatch.setattr(dataset_cache, "_write_chunks", unconvertible)
+    assert dataset_cache.convert_to_columnar(upload, ".csv") is None
+    assert os.path.exists(os.path.join(os.path.dirname(upload), dataset_cache.COLUMNAR_FAILED_FILENAME))
+
+    # Later conversions and reads go straight to the source file
+    monkeypatch.setattr(dataset_cache, "_write_chunks", lambda *args: pytest.fail("conversion retried"))
+    monkeypatch.setattr(dataset_cache, "_write_columnar", lambda *args: pytest.fail("conversion retried"))
+    assert dataset_cache.convert_to_columnar(upload, ".csv") is None
+    assert list(dataset_cache.read_dataset(upload, ".csv")["amount"]) == [10, 20, 30]
+    assert not os.path.exists(dataset_cache.columnar_path(upload))
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.core.fast_path import _chart_code, _plan_chart, match_intents
+
+COLUMNS = ["age", "salary", "gender", "department"]
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "age": [25, 32, 47],
+        "salary": [40000.0, 52000.0, 61000.0],
+        "gender": ["F", "M", "F"],
+        "department": ["HR", "IT", "IT"],
+    })
+
+
+def _plans(text, df):
+    intents = match_intents(text, COLUMNS)
+    if intents is None:
+        return None
+    plans = [_plan_chart(intent, df) for intent in intents if intent["kind"] == "chart"]
+    return None if None in plans else plans
+
+
+@pytest.mark.parametrize("text", [
+    "drop the age column",
+    "remove the salary column",
+    "show missing values in age",
+    "describe salary",
+])
+def test_column_specific_tasks_fall_back(text):
+    assert match_intents(text, COLUMNS) is None
+
+
+@pytest.mark.parametrize("text", [
+    "distribution of salary by gender",
+    "bar chart of department by gender",
+    "pie chart of gender by department",
+    "scatter plot of age salary gender",
+])
+def test_charts_with_unused_columns_fall_back(text, df):
+    assert _plans(text, df) is None
+
+
+def test_whole_dataset_tasks_stay_on_fast_path():
+    assert [intent["kind"] for intent in match_intents("show missing values and clean the data", COLUMNS)] == ["missing", "clean"]
+
+
+def test_supported_charts_are_planned(df):
+    assert _plans("histogram of age and salary", df) == [("histogram", "age", None), ("histogram", "salary", None)]
+    assert _plans("scatter plot of age vs salary", df) == [("scatter", "age", "salary")]
+    assert _plans("bar chart of department", df) == [("bar", "department", None)]
+
+
+@pytest.mark.parametrize("write", [
+    lambda df, path: df.to_json(path, orient="records", lines=True),  # JSON-lines upload
+    lambda df, path: df.to_json(path, orient="records"),  # Cleaned data, a JSON array
+])
+def test_saved_chart_code_reruns_for_json(df, tmp_path, write):
+    data_path = str(tmp_path / "data.json")
+    write(df, data_path)
+    png_path = str(tmp_path / "age_histogram.png")
+
+    code = _chart_code(data_path, ".json", 'ax.hist(df["age"].dropna())\n', png_path)
+    exec(compile(code, "age_histogram_code.py", "exec"), {})
+
+    assert os.path.getsize(png_path) > 0
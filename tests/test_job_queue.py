@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+
+from app.core import job_queue
+from app.database import database, migrations, models
+
+
+@pytest.fixture
+def db():
+    migrations.run_migrations(database.engine)
+    with database.session_scope() as session:
+        session.query(models.Job).delete()
+        for session_id in ("jq1", "jq2"):
+            if session.query(models.Session).filter_by(session_id=session_id).first() is None:
+                session.add(models.Session(session_id=session_id, status="queued"))
+    db = database.SessionLocal()
+    yield db
+    db.close()
+
+
+def _enqueue(db, session_id="jq1", priority=0):
+    return job_queue.enqueue(db, session_id, "plot age", "/tmp/data.csv", "preview", priority=priority).id
+
+
+def _claim_all(worker_id):
+    db = database.SessionLocal()
+    try:
+        claimed = []
+        while (job := job_queue.claim_next_job(db, worker_id)) is not None:
+            claimed.append(job.id)
+        return claimed
+    finally:
+        db.close()
+
+
+def test_concurrent_workers_never_claim_the_same_job(db):
+    job_ids = [_enqueue(db) for _ in range(40)]
+    start = threading.Barrier(8)
+
+    def worker(index):
+        start.wait()
+        return _claim_all(f"worker-{index}")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        claimed = [job_id for jobs in pool.map(worker, range(8)) for job_id in jobs]
+
+    assert sorted(claimed) == job_ids
+    db.expire_all()
+    jobs = db.query(models.Job).all()
+    assert all(job.status == "running" and job.attempts == 1 for job in jobs)
+
+
+def test_higher_priority_first_then_fifo(db):
+    low_first = _enqueue(db)
+    high_first = _enqueue(db, priority=5)
+    low_second = _enqueue(db)
+    high_second = _enqueue(db, priority=5)
+
+    assert _claim_all("worker-1") == [high_first, high_second, low_first, low_second]
+
+
+def test_jobs_of_a_silent_worker_are_requeued(db):
+    stale, fresh, exhausted = _enqueue(db), _enqueue(db), _enqueue(db)
+    _claim_all("worker-1")
+    old = job_queue._utcnow() - timedelta(seconds=600)
+    db.query(models.Job).filter(models.Job.id.in_([stale, exhausted])).update(
+        {models.Job.heartbeat_at: old}, synchronize_session=False
+    )
+    db.query(models.Job).filter(models.Job.id == exhausted).update(
+        {models.Job.attempts: job_queue.JOB_MAX_ATTEMPTS}, synchronize_session=False
+    )
+    db.commit()
+
+    assert job_queue.requeue_stale_jobs(db, stale_after=60) == 2
+
+    db.expire_all()
+    assert (db.get(models.Job, stale).status, db.get(models.Job, stale).worker_id) == ("queued", None)
+    assert db.get(models.Job, fresh).status == "running"  # Still heartbeating
+    assert db.get(models.Job, exhausted).status == "failed"
+    # The requeued job is claimed again, as its second attempt
+    job = job_queue.claim_next_job(db, "worker-2")
+    assert (job.id, job.attempts) == (stale, 2)
+
+
+def test_cancel_session_jobs(db):
+    running = _enqueue(db, "jq1")
+    job_queue.claim_next_job(db, "worker-1")
+    queued = _enqueue(db, "jq1")
+    other_session = _enqueue(db, "jq2")
+
+    assert job_queue.cancel_session_jobs(db, "jq1") == 2
+
+    db.expire_all()
+    assert db.get(models.Job, queued).status == "cancelled"
+    assert db.get(models.Job, queued).finished_at is not None
+    # The running job is only flagged; its worker stops it
+    assert (db.get(models.Job, running).status, db.get(models.Job, running).cancel_requested) == ("running", True)
+    # A cancelled job is never claimed
+    assert job_queue.claim_next_job(db, "worker-2").id == other_session
+    assert job_queue.claim_next_job(db, "worker-2") is None
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.agents import agent_setup
+from app.core import agent_service
+from app.core.kernel import KILLED_EXIT_CODE, TIMEOUT_EXIT_CODE, KernelCodeExecutor, PythonKernel
+from app.database.persistence import RunRecorder
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "uploads" / "k1" / "data.csv"
+    path.parent.mkdir(parents=True)
+    pd.DataFrame({"age": [25, 32, 47]}).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def kernel(tmp_path, dataset):
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    kernel = PythonKernel(str(work_dir), dataset, timeout=2, memory_limit_mb=4096)
+    kernel.start()
+    yield kernel
+    kernel.stop()
+
+
+def test_variables_and_preloaded_dataset_persist_between_blocks(kernel, dataset):
+    assert kernel.execute("total = int(df['age'].sum())") == (0, "")
+    assert kernel.execute("print(total + 1, type(np.zeros(1)).__name__)") == (0, "105 ndarray\n")
+
+    # The dataset is read with the plain reader: no Parquet copy next to it or in the work dir
+    assert os.listdir(os.path.dirname(dataset)) == ["data.csv"]
+    assert os.listdir(kernel.work_dir) == []
+
+
+def test_block_timeout_restarts_the_kernel(kernel):
+    kernel.execute("x = 1")
+    first_pid = kernel._process.pid
+
+    exit_code, output = kernel.execute("import time\ntime.sleep(30)")
+    assert exit_code == TIMEOUT_EXIT_CODE
+    assert "kernel restarted" in output
+
+    # The next block runs in a fresh kernel, without the old variables
+    exit_code, output = kernel.execute("print(x)")
+    assert exit_code == 1 and "NameError" in output
+    assert kernel._process.pid != first_pid
+
+
+def test_memory_limit_raises_memory_error_without_killing_the_kernel(kernel):
+    pid = kernel.execute("import os\nprint(os.getpid())")[1].strip()
+
+    exit_code, output = kernel.execute("block = bytearray(8 * 1024 ** 3)")
+    assert exit_code == 1 and "MemoryError" in output
+    assert exit_code != KILLED_EXIT_CODE
+
+    assert kernel.execute("print(os.getpid())") == (0, f"{pid}\n")
+
+
+def test_kernel_is_shut_down_when_the_run_ends(tmp_path, dataset, monkeypatch):
+    monkeypatch.setattr(agent_setup, "KERNEL_ENABLED", True)
+    monkeypatch.setattr(agent_service, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent_service, "ORCHESTRATION_MODE", "state_machine")
+    monkeypatch.setattr(agent_service, "generate_chart_previews", lambda files, recorder: None)
+    teams = []
+
+    def build(work_dir, dataset_path=None):
+        team = agent_setup.build_agent_team(work_dir, dataset_path)
+        team.inspector.register_reply(
+            [agent_setup.autogen.Agent, None],
+            lambda recipient, messages=None, sender=None, config=None: (True, "```python\nprint(df.shape)\n```"),
+            position=0,
+        )
+        team.reporter.register_reply(
+            [agent_setup.autogen.Agent, None],
+            lambda recipient, messages=None, sender=None, config=None: (True, "Report complete"),
+            position=0,
+        )
+        teams.append((team, team.kernel.kernel._process))
+        return team
+    monkeypatch.setattr(agent_service, "build_agent_team", build)
+
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    result = agent_service._run_group_chat(
+        "k1", "inspect the data", dataset, "Task", str(results_dir), str(tmp_path), RunRecorder("k1"),
+    )
+
+    executed = [m["content"] for m in result["chat_history"] if m.get("name") == "CodeExecutor"]
+    assert "(3, 1)" in executed[0]
+    team, process = teams[0]
+    assert isinstance(team.kernel, KernelCodeExecutor)
+    assert team.kernel.kernel._process is None
+    assert not process.is_alive()
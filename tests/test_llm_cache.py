@@ -0,0 +1,76 @@
+import autogen
+import httpx
+import pytest
+
+from app.agents.compaction import ContextCompactor
+from app.core import llm_cache
+from app.core.cache_store import SqliteCache
+from app.core.llm_cache import RunLLMCache, cache_key
+from app.core.llm_scheduler import PooledHTTPClient
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = SqliteCache(str(tmp_path / "llm.sqlite"), ttl_seconds=3600, max_bytes=1 << 20)
+    monkeypatch.setattr(llm_cache, "store", store)
+    return store
+
+
+def _mock_llm():
+    """Stand-in OpenAI-compatible endpoint counting the completions it serves."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={
+            "id": "c1", "object": "chat.completion", "created": 0, "model": "test-model",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "Done"}}],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 5, "total_tokens": 125},
+        })
+    return PooledHTTPClient(transport=httpx.MockTransport(handler)), calls
+
+
+def _run(http_client, cache, message):
+    assistant = autogen.AssistantAgent("assistant", llm_config={"config_list": [{
+        "model": "test-model", "api_key": "test", "base_url": "http://llm.test/v1", "http_client": http_client,
+    }], "cache_seed": None})
+    user = autogen.UserProxyAgent("user", human_input_mode="NEVER", code_execution_config=False)
+    user.initiate_chat(assistant, message=message, max_turns=1, cache=cache, silent=True)
+    return autogen.gather_usage_summary([assistant])
+
+
+def test_key_ignores_whitespace_only_differences():
+    request = {"model": "m", "messages": [{"role": "user", "content": "plot age\n"}]}
+    assert cache_key(request) == cache_key({"model": "m", "messages": [{"role": "user", "content": "plot age  \r\n\n"}]})
+    assert cache_key(request) != cache_key({"model": "m", "messages": [{"role": "user", "content": "plot salary"}]})
+
+
+def test_repeated_run_is_served_from_cache():
+    http_client, calls = _mock_llm()
+
+    first = RunLLMCache()
+    usage = _run(http_client, first, "Summarize the dataset")
+    assert (first.hits, first.misses, len(calls)) == (0, 1, 1)
+    assert usage["usage_excluding_cached_inference"]["test-model"]["prompt_tokens"] == 120
+
+    second = RunLLMCache()
+    usage = _run(http_client, second, "Summarize the dataset  ")
+    assert (second.hits, second.misses, len(calls)) == (1, 0, 1)
+    # Tokens served from the cache are not sent to the API
+    assert "test-model" not in usage["usage_excluding_cached_inference"]
+    assert second.stats()["cache_hits"] == 1
+    assert second.stats()["estimated_seconds_saved"] >= 0
+
+
+def test_compaction_shrinks_old_turns_and_long_output():
+    compactor = ContextCompactor(keep_recent=2, old_message_chars=100, max_output_chars=200)
+    messages = [{"role": "user", "content": " ".join(["task"] * 50)}]
+    messages += [{"role": "user", "content": "exitcode: 0 (execution succeeded)\n" + "row\n" * 500} for _ in range(4)]
+
+    compacted = compactor(messages)
+
+    assert compacted[0] == messages[0]
+    assert all(len(m["content"]) < 260 for m in compacted[1:])
+    assert "characters omitted" in compacted[-1]["content"]
+    stats = compactor.stats()
+    assert stats["chars_after"] < stats["chars_before"] / 5
@@ -0,0 +1,95 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.core.llm_scheduler import KeyPoolTransport, KeyScheduler, parse_duration
+
+
+def _stand_in_server(throttled_keys, delay=0.0):
+    """Stand-in for the LLM API: 429s with reset headers for throttled keys, completions otherwise."""
+    seen = []
+    lock = threading.Lock()
+
+    def handler(request):
+        key = request.headers["Authorization"].removeprefix("Bearer ")
+        with lock:
+            seen.append(key)
+        time.sleep(delay)
+        if key in throttled_keys:
+            return httpx.Response(429, headers={"retry-after": "30", "x-ratelimit-remaining-requests": "0"},
+                                  json={"error": {"message": "rate limited"}})
+        return httpx.Response(200, headers={"x-ratelimit-remaining-tokens": "25000"},
+                              json={"choices": [{"message": {"content": "ok"}}]})
+    return httpx.MockTransport(handler), seen
+
+
+def _client(scheduler, transport):
+    return httpx.Client(transport=KeyPoolTransport(scheduler, transport), base_url="http://llm.test")
+
+
+def _complete(client):
+    return client.post("/v1/chat/completions", content=json.dumps({"messages": [{"role": "user", "content": "hi"}], "max_tokens": 50}))
+
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration("soon") is None
+
+
+def test_throttled_key_is_rested_and_the_call_moves_to_another_key():
+    scheduler = KeyScheduler(["key-aaaa", "key-bbbb"], requests_per_minute=600, tokens_per_minute=100000)
+    transport, seen = _stand_in_server(throttled_keys={"key-aaaa"})
+
+    responses = [_complete(_client(scheduler, transport)) for _ in range(10)]
+
+    assert all(response.status_code == 200 for response in responses)
+    # key-aaaa got at most one 429 and then rested for its retry-after
+    assert seen.count("key-aaaa") == 1
+    stats = {key["key"]: key for key in scheduler.stats()["keys"]}
+    assert stats["...aaaa"]["throttled"] == 1
+    assert stats["...bbbb"]["sent"] == 10
+
+
+def test_concurrent_calls_spread_across_keys():
+    keys = ["key-0001", "key-0002", "key-0003"]
+    scheduler = KeyScheduler(keys, requests_per_minute=600, tokens_per_minute=1000000)
+    transport, seen = _stand_in_server(throttled_keys=set(), delay=0.02)
+    client = _client(scheduler, transport)
+
+    with ThreadPoolExecutor(max_workers=9) as pool:
+        responses = list(pool.map(lambda _: _complete(client), range(30)))
+
+    assert all(response.status_code == 200 for response in responses)
+    counts = [seen.count(key) for key in keys]
+    assert min(counts) >= 5, counts
+
+
+def test_calls_wait_for_budget_instead_of_failing():
+    scheduler = KeyScheduler(["key-aaaa"], requests_per_minute=120, tokens_per_minute=100000)  # 2 requests/s
+    scheduler.keys[0].requests.tokens = 0
+
+    started = time.monotonic()
+    state = scheduler.acquire(10, timeout=5)
+    waited = time.monotonic() - started
+    scheduler.release(state)
+
+    assert 0.3 < waited < 2
+
+
+def test_queue_timeout_returns_429(monkeypatch):
+    from app.core import llm_scheduler
+
+    monkeypatch.setattr(llm_scheduler, "LLM_QUEUE_TIMEOUT_SECONDS", 0.2)
+    scheduler = KeyScheduler(["key-aaaa"], requests_per_minute=1, tokens_per_minute=100000)
+    scheduler.keys[0].requests.tokens = 0
+    transport, seen = _stand_in_server(throttled_keys=set())
+
+    assert _complete(_client(scheduler, transport)).status_code == 429
+    assert seen == []
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import logs
+from app.database import database, migrations, models
+from app.database.persistence import RunRecorder
+
+
+@pytest.fixture
+def client():
+    migrations.run_migrations(database.engine)
+    with database.session_scope() as db:
+        for session_id in ("l1", "l2"):
+            db.query(models.Log).filter_by(session_id=session_id).delete()
+            db.query(models.Session).filter_by(session_id=session_id).delete()
+            db.add(models.Session(session_id=session_id, status="running"))
+    app = FastAPI()
+    app.include_router(logs.router)
+    return TestClient(app)
+
+
+def _write(session_id, messages):
+    recorder = RunRecorder(session_id)
+    recorder.add_chat_history(messages)
+    recorder.flush()
+
+
+def _transcript(count, start=0):
+    agents = ["DataInspectorAgent", "CodeExecutor"]
+    return [{"name": agents[i % 2], "content": f"message {i}"} for i in range(start, start + count)]
+
+
+def test_pages_follow_the_cursor_and_tail_new_logs(client):
+    _write("l1", _transcript(25))
+
+    contents, after, pages = [], 0, 0
+    while True:
+        body = client.get("/logs/l1", params={"after": after, "limit": 10}).json()
+        contents += [log["output_summary"] for log in body["logs"]]
+        pages += 1
+        if body["next_cursor"] is None:
+            break
+        after = body["next_cursor"]
+    assert contents == [f"message {i}" for i in range(25)]
+    assert pages == 3
+
+    # Tailing: only logs written after the last one read come back
+    last_id = client.get("/logs/l1", params={"after": after, "limit": 10}).json()["logs"][-1]["id"]
+    _write("l1", _transcript(3, start=25))
+    body = client.get("/logs/l1", params={"after": last_id}).json()
+    assert [log["output_summary"] for log in body["logs"]] == ["message 25", "message 26", "message 27"]
+    assert body["next_cursor"] is None
+
+
+def test_command_filter_and_stream(client):
+    _write("l1", _transcript(20))
+
+    body = client.get("/logs/l1", params={"command": "CodeExecutor", "limit": 100}).json()
+    assert [log["output_summary"] for log in body["logs"]] == [f"message {i}" for i in range(1, 20, 2)]
+
+    first_id = client.get("/logs/l1", params={"limit": 1}).json()["logs"][0]["id"]
+    response = client.get("/logs/l1", params={"stream": True, "after": first_id})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [json.loads(line)["output_summary"] for line in response.text.splitlines()]
+    assert streamed == [f"message {i}" for i in range(1, 20)]
+
+
+def test_session_without_logs(client):
+    _write("l1", _transcript(5))  # Another session's transcript must not leak in
+
+    assert client.get("/logs/l2").json() == {"session_id": "l2", "logs": [], "next_cursor": None}
+    assert client.get("/logs/l2", params={"stream": True}).text == ""
+    assert client.get("/logs/missing").status_code == 404
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from app.database import migrations
+from app.database.engine import build_engine
+
+SESSION_QUERY = text("SELECT id FROM logs WHERE session_id = :sid ORDER BY timestamp")
+FILES_QUERY = text("SELECT id, file_path FROM files WHERE session_id = :sid")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_create_session_indexes_once(engine):
+    assert migrations.run_migrations(engine) == len(migrations.MIGRATIONS)
+    assert migrations.run_migrations(engine) == len(migrations.MIGRATIONS)  # Idempotent
+
+    inspector = inspect(engine)
+    assert {"ix_logs_session_id", "ix_logs_session_id_timestamp"} <= {i["name"] for i in inspector.get_indexes("logs")}
+    assert {"ix_files_session_id", "ix_files_file_type"} <= {i["name"] for i in inspector.get_indexes("files")}
+    with engine.connect() as connection:
+        versions = connection.execute(text("SELECT version FROM schema_version")).scalars().all()
+    assert sorted(versions) == [number for number, _, _ in migrations.MIGRATIONS]
+
+
+def _plan(engine, query):
+    with engine.connect() as connection:
+        return " | ".join(str(row[-1]) for row in connection.execute(text("EXPLAIN QUERY PLAN " + query.text), {"sid": "s1"}))
+
+
+def test_session_lookups_search_the_indexes(engine):
+    migrations.run_migrations(engine)
+
+    log_plan = _plan(engine, SESSION_QUERY)
+    assert "SEARCH logs" in log_plan and "ix_logs_session_id_timestamp" in log_plan
+    assert "TEMP B-TREE" not in log_plan  # ORDER BY timestamp comes from the index, no sort
+    assert "ix_files_session_id" in _plan(engine, FILES_QUERY)
+
+
+def test_without_the_indexes_session_lookups_scan_and_sort(engine):
+    migrations.run_migrations(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_logs_session_id_timestamp"))
+        connection.execute(text("DROP INDEX ix_logs_session_id"))
+    engine.dispose()  # Pooled connections may still hold plans prepared against the old schema
+
+    log_plan = _plan(engine, SESSION_QUERY)
+    assert "SCAN logs" in log_plan and "TEMP B-TREE" in log_plan
@@ -0,0 +1,46 @@
+import pytest
+
+from app.agents import agent_setup
+from app.core import agent_service
+from app.database.persistence import RunRecorder
+
+
+def _scripted_team(replies):
+    """build_agent_team whose LLM agents answer from `replies` instead of calling a model."""
+    def build(work_dir, dataset_path=None):
+        team = agent_setup.build_agent_team(work_dir, dataset_path)
+        for agent in (team.inspector, team.visualizer, team.reporter):
+            agent.register_reply(
+                [agent_setup.autogen.Agent, None],
+                lambda recipient, messages=None, sender=None, config=None: (True, replies[recipient.name]),
+                position=0,
+            )
+        return team
+    return build
+
+
+@pytest.fixture
+def scripted(monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_setup, "KERNEL_ENABLED", False)
+    monkeypatch.setattr(agent_service, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent_service, "ORCHESTRATION_MODE", "state_machine")
+    monkeypatch.setattr(agent_service, "generate_chart_previews", lambda files, recorder: None)
+
+    def run(prompt, replies):
+        monkeypatch.setattr(agent_service, "build_agent_team", _scripted_team(replies))
+        results_dir = tmp_path / "results"
+        results_dir.mkdir(exist_ok=True)
+        result = agent_service._run_group_chat(
+            "orch", prompt, str(tmp_path / "data.csv"), "Task", str(results_dir), str(tmp_path), RunRecorder("orch"),
+        )
+        return [message.get("name") for message in result["chat_history"]]
+    return run
+
+
+def test_completion_phrase_mid_stage_does_not_skip_later_stages(scripted):
+    speakers = scripted("inspect the data and plot a histogram of age", {
+        "DataInspectorAgent": "The analysis is complete.",
+        "VisualizationAgent": "",
+        "ReportAgent": "Report complete",
+    })
+    assert speakers[1:] == ["DataInspectorAgent", "VisualizationAgent", "ReportAgent"]
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+
+from app.database import database, migrations, models
+from app.database.persistence import RunRecorder
+
+
+@pytest.fixture
+def session_id():
+    migrations.run_migrations(database.engine)
+    with database.session_scope() as db:
+        for model in (models.Log, models.File, models.Session):
+            db.query(model).filter_by(session_id="bulk").delete()
+        db.add(models.Session(session_id="bulk", status="running"))
+    return "bulk"
+
+
+@pytest.fixture
+def commits():
+    count = {"n": 0}
+
+    def on_commit(connection):
+        count["n"] += 1
+    event.listen(database.engine, "commit", on_commit)
+    yield count
+    event.remove(database.engine, "commit", on_commit)
+
+
+def _fill(recorder, logs=300, files=10):
+    recorder.add_chat_history([{"name": "DataInspectorAgent", "content": f"message {i}"} for i in range(logs)])
+    for i in range(files):
+        recorder.add_file("visualization", f"/tmp/chart_{i}.png")
+
+
+def test_run_is_written_in_one_commit(session_id, commits):
+    recorder = RunRecorder(session_id)
+    _fill(recorder)
+
+    recorder.flush(status="completed")
+
+    assert commits["n"] == 1
+    with database.session_scope() as db:
+        assert db.query(models.Log).filter_by(session_id=session_id).count() == 300
+        assert db.query(models.File).filter_by(session_id=session_id).count() == 10
+        assert db.query(models.Session).filter_by(session_id=session_id).one().status == "completed"
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_bulk_flush_replaces_a_commit_per_row(session_id, commits, statements):
+    # The old path: one session and one commit for every log and file row
+    for i in range(300):
+        with database.session_scope() as db:
+            db.add(models.Log(session_id=session_id, command="DataInspectorAgent", output_summary=f"message {i}"))
+    for i in range(10):
+        with database.session_scope() as db:
+            db.add(models.File(session_id=session_id, file_type="visualization", file_path=f"/tmp/chart_{i}.png"))
+    per_row = (commits["n"], statements.count("INSERT"))
+
+    commits["n"] = 0
+    statements.clear()
+    recorder = RunRecorder(session_id)
+    _fill(recorder)
+    recorder.flush(status="completed")
+
+    assert per_row == (310, 310)
+    # One executemany INSERT per table and the status UPDATE, in one commit
+    assert commits["n"] == 1
+    assert statements == ["INSERT", "INSERT", "UPDATE"]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.core import dataset_cache, preview
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16])
+def test_iter_json_array_keeps_scalars_split_across_chunks(tmp_path, monkeypatch, chunk_size):
+    values = [12345, -6.25e3, 1.5, True, None, "text", {"a": [1, 22]}, 987654321]
+    path = tmp_path / "values.json"
+    path.write_text(json.dumps(values))
+    monkeypatch.setattr(preview, "CHUNK_SIZE", chunk_size)
+
+    assert list(preview.iter_json_array(str(path))) == values
+
+
+def test_csv_row_count_is_labelled_as_estimate(tmp_path):
+    path = tmp_path / "uploads" / "p1" / "notes.csv"
+    path.parent.mkdir(parents=True)
+    path.write_text('id,note\n1,"first line\nsecond line"\n2,plain\n')
+    dataset_cache.invalidate("p1")
+
+    estimated = preview.build_preview("p1", str(path), ".csv")
+    assert estimated["row_count_estimated"] is True
+    assert estimated["row_count"] == 3  # Lines, not rows
+
+    dataset_cache.convert_to_columnar(str(path), ".csv")
+    exact = preview.build_preview("p1", str(path), ".csv")
+    assert exact["row_count_estimated"] is False
+    assert exact["row_count"] == 2
+
+
+def test_large_csv_preview_never_parses_the_whole_file(tmp_path, monkeypatch):
+    import tracemalloc
+
+    import pandas as pd
+
+    path = tmp_path / "uploads" / "big" / "big.csv"
+    path.parent.mkdir(parents=True)
+    pd.DataFrame({"id": range(300_000), "city": ["Ahmedabad"] * 300_000, "amount": [1.5] * 300_000}).to_csv(path, index=False)
+    dataset_cache.invalidate("big")
+
+    # Only a bounded head read is allowed, never a full parse
+    read_csv = pd.read_csv
+
+    def head_only(*args, **kwargs):
+        assert kwargs.get("nrows"), "full CSV parse"
+        return read_csv(*args, **kwargs)
+    monkeypatch.setattr(pd, "read_csv", head_only)
+    monkeypatch.setattr(dataset_cache, "read_source", lambda *args: pytest.fail("full parse"))
+    monkeypatch.setattr(dataset_cache, "load_dataset", lambda *args: pytest.fail("full parse"))
+
+    tracemalloc.start()
+    result = preview.build_preview("big", str(path), ".csv", n_rows=10)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert result["row_count"] == 300_000 and result["row_count_estimated"] is True
+    assert len(result["table_data"]) == 10 and result["column_count"] == 3
+    assert peak < 5 * preview.CHUNK_SIZE  # Independent of the ~9 MB file
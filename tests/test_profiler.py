@@ -0,0 +1,19 @@
+import json
+
+from app.core import archive, profiler
+
+
+def test_profile_does_not_overwrite_an_upload_named_profile_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "RESULTS_DIRECTORY", str(tmp_path / "results"))
+    monkeypatch.setattr(archive, "UPLOADS_DIRECTORY", str(tmp_path / "uploads"))
+    upload = tmp_path / "uploads" / "p1" / "profile.json"
+    upload.parent.mkdir(parents=True)
+    records = [{"age": 30, "city": "Pune"}, {"age": 41, "city": "Surat"}]
+    upload.write_text(json.dumps(records))
+
+    profile = profiler.write_profile(str(upload), ".json")
+
+    assert profile["row_count"] == 2
+    assert json.loads(upload.read_text()) == records
+    assert profiler.load_profile(str(upload))["row_count"] == 2
+    assert [name for name, _ in archive.session_files("p1")] == ["profile.json"]
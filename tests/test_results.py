@@ -0,0 +1,121 @@
+import os
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from PIL import Image
+
+from app.api import results
+from app.core import agent_service, chart_previews, events, file_delivery
+from app.database import database, migrations, models
+from app.database.persistence import RunRecorder
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    migrations.run_migrations(database.engine)
+    monkeypatch.setattr(results, "RESULTS_DIRECTORY", str(tmp_path / "results"))
+    results_dir = tmp_path / "results" / "r1"
+    results_dir.mkdir(parents=True)
+    upload = tmp_path / "uploads" / "r1" / "data.csv"
+    upload.parent.mkdir(parents=True)
+    upload.write_text("a\n1\n")
+    chart = results_dir / "age_histogram.png"
+    chart.write_bytes(b"first")
+    with database.session_scope() as db:
+        for model in (models.File, models.Session):
+            db.query(model).filter_by(session_id="r1").delete()
+        db.add(models.Session(session_id="r1", status="completed"))
+        db.flush()
+        db.add(models.File(session_id="r1", file_type=".csv", file_path=str(upload)))
+        db.add(models.File(session_id="r1", file_type="visualization", file_path=str(chart)))
+
+    app = FastAPI()
+    app.include_router(results.router)
+    return TestClient(app), chart
+
+
+def test_upload_is_not_listed_as_a_result(client):
+    client, _ = client
+    body = client.get("/results/r1").json()
+    assert body["results"]["other"] == []
+    assert body["total_files"] == 1
+
+
+def test_url_version_follows_the_file_contents(client):
+    client, chart = client
+    url = client.get("/results/r1").json()["results"]["visualizations"][0]["url"]
+    response = client.get(url)
+    assert response.content == b"first"
+    assert "immutable" in response.headers["cache-control"]
+
+    # A later run rewrites the same filename: new URL, and the old one is no longer immutable
+    time.sleep(0.01)
+    chart.write_bytes(b"second run")
+    new_url = client.get("/results/r1").json()["results"]["visualizations"][0]["url"]
+    assert new_url != url
+    assert "immutable" in client.get(new_url).headers["cache-control"]
+    stale = client.get(url)
+    assert stale.content == b"second run"
+    assert "immutable" not in stale.headers["cache-control"]
+
+
+def test_concurrent_chart_fetches(client, monkeypatch):
+    client, chart = client
+    chart.write_bytes(os.urandom(2 * 1024 * 1024))
+    url = client.get("/results/r1").json()["results"]["visualizations"][0]["url"]
+    etag = client.get(url).headers["etag"]
+
+    # Count content hashes from here on: every fetch below must reuse the cached ETag
+    hashes = []
+
+    class CountingHashlib:
+        @staticmethod
+        def sha256(*args):
+            if not args:
+                hashes.append(1)
+            return hashlib.sha256(*args)
+    monkeypatch.setattr(file_delivery, "hashlib", CountingHashlib)
+
+    def fetch(headers):
+        response = client.get(url, headers=headers)
+        return response.status_code, len(response.content)
+
+    fetches = 200
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        full = list(pool.map(fetch, [{}] * fetches))
+        revalidated = list(pool.map(fetch, [{"If-None-Match": etag}] * fetches))
+        ranged = list(pool.map(fetch, [{"Range": "bytes=0-65535"}] * fetches))
+    elapsed = time.perf_counter() - started
+
+    print(f"{fetches * 3} concurrent chart fetches of 2 MB in {elapsed:.2f} s")
+    assert set(full) == {(200, 2 * 1024 * 1024)}
+    assert set(revalidated) == {(304, 0)}
+    assert set(ranged) == {(206, 65536)}
+    assert hashes == []
+
+
+def test_announced_files_can_be_fetched_right_away(client, monkeypatch):
+    client, chart = client
+    Image.new("RGB", (1200, 800), "red").save(chart.parent / "salary_bar.png")
+    fetched = []
+
+    def publish(session_id, event_type, **data):
+        # A listener following the event's URL as soon as it arrives
+        if event_type == "file":
+            fetched.append((data["filename"], client.get(data["url"]).status_code))
+    monkeypatch.setattr(events, "publish", publish)
+
+    recorder = RunRecorder("r1")
+    registered = agent_service.register_result_files(str(chart.parent), recorder)
+    chart_previews.generate_chart_previews([f for f in registered if f["filename"] == "salary_bar.png"], recorder)
+
+    names = [name for name, _ in fetched]
+    assert "salary_bar.png" in names
+    assert len([name for name in names if name.startswith(("salary_bar.thumb.", "salary_bar.web."))]) == 2
+    assert {status for _, status in fetched} == {200}
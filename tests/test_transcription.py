@@ -0,0 +1,79 @@
+import io
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import transcription
+from app.core.transcription import TranscriptionError, transcribe
+
+
+def _stand_in(responses, delay=0.0):
+    """Stand-in transcription server replying with `responses` in order, then 200s."""
+    state = {"calls": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def handler(request):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(delay)
+            if responses:
+                return responses.pop(0)
+            return httpx.Response(200, json={"text": "show missing values"})
+        finally:
+            state["in_flight"] -= 1
+    return httpx.MockTransport(handler), state
+
+
+@pytest.fixture
+def use_server(monkeypatch):
+    monkeypatch.setattr(transcription, "BACKOFF_BASE_SECONDS", 0.01)
+
+    def install(transport, concurrency=8):
+        monkeypatch.setattr(transcription, "_client", httpx.AsyncClient(transport=transport))
+        monkeypatch.setattr(transcription, "_semaphore", asyncio.Semaphore(concurrency))
+    return install
+
+
+def _clip():
+    return io.BytesIO(b"RIFF....WAVEfmt audio")
+
+
+def test_retries_rate_limits_and_server_errors(use_server):
+    transport, state = _stand_in([
+        httpx.Response(429, headers={"retry-after": "0"}),
+        httpx.Response(503),
+    ])
+    use_server(transport)
+
+    text = asyncio.run(transcribe(_clip(), "clip.wav", "audio/wav", "key"))
+
+    assert text == "show missing values"
+    assert state["calls"] == 3
+
+
+def test_client_errors_are_not_retried(use_server):
+    transport, state = _stand_in([httpx.Response(400, json={"error": "bad audio"})])
+    use_server(transport)
+
+    with pytest.raises(TranscriptionError):
+        asyncio.run(transcribe(_clip(), "clip.wav", "audio/wav", "key"))
+    assert state["calls"] == 1
+
+
+def test_concurrent_uploads_overlap_up_to_the_cap(use_server):
+    transport, state = _stand_in([], delay=0.2)
+    use_server(transport, concurrency=3)
+
+    async def upload_six():
+        return await asyncio.gather(*[transcribe(_clip(), "clip.wav", "audio/wav", "key") for _ in range(6)])
+
+    started = time.perf_counter()
+    texts = asyncio.run(upload_six())
+    elapsed = time.perf_counter() - started
+
+    assert texts == ["show missing values"] * 6
+    assert state["max_in_flight"] == 3
+    assert elapsed < 6 * 0.2 * 0.75  # Two overlapping waves, not six serialized calls
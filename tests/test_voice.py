@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import voice
+from app.core import transcription_cache
+from app.core.cache_store import SqliteCache
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcription_cache, "store", SqliteCache(str(tmp_path / "t.sqlite"), ttl_seconds=60, max_bytes=1 << 20))
+    monkeypatch.setattr(voice, "VOICE_STREAM_UPLOADS", True)
+    calls = []
+
+    async def fake_transcribe(audio_file, filename, content_type, api_key):
+        calls.append(filename)
+        return "plot age"
+
+    monkeypatch.setattr(voice, "transcribe", fake_transcribe)
+    app = FastAPI()
+    app.include_router(voice.router)
+    return TestClient(app), calls
+
+
+def test_replayed_clip_is_served_from_cache_off_the_event_loop(client, monkeypatch):
+    client, calls = client
+    on_event_loop = []
+    original_key = transcription_cache.audio_key
+
+    def recording_key(audio_file, model):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        return original_key(audio_file, model)
+
+    monkeypatch.setattr(transcription_cache, "audio_key", recording_key)
+    for _ in range(2):
+        response = client.post("/voice", data={"session_id": "v1"}, files={"file": ("clip.webm", b"\x1aE\xdf\xa3audio", "audio/webm")})
+        assert response.json()["transcribed_text"] == "plot age"
+
+    assert calls == ["clip.webm"]
+    assert on_event_loop == [False, False]
+
+
+def test_clip_limits_are_checked_off_the_event_loop(client, monkeypatch):
+    client, calls = client
+    on_event_loop = []
+    original_size = voice.clip_size
+
+    def recording_size(audio_file):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        return original_size(audio_file)
+
+    monkeypatch.setattr(voice, "clip_size", recording_size)
+    monkeypatch.setattr(voice, "VOICE_MAX_BYTES", 4)
+    response = client.post("/voice", data={"session_id": "v1"}, files={"file": ("clip.webm", b"too long", "audio/webm")})
+
+    assert response.status_code == 413
+    assert on_event_loop == [False]
+    assert calls == []